@@ -0,0 +1,119 @@
+"""Compare the streamed, compiled commit filter with the former line by line
+search over the whole history
+
+Both read the history of a synthetic repository, the same way the release
+does it: the former one gets the whole git log and then searches each line
+for every commit message to ignore, the current one streams git log through
+iter_filtered_git_history.
+
+Run it with::
+
+    python benchmarks/filter_git_history.py [--commits 50000] [--repeat 5]
+"""
+
+from freitag.releaser import IGNORE_COMMIT_MESSAGES
+from freitag.releaser.utils import compile_commit_filter
+from freitag.releaser.utils import get_compact_git_history
+from freitag.releaser.utils import iter_compact_git_history
+from freitag.releaser.utils import iter_filtered_git_history
+from git import Repo
+from tempfile import mkdtemp
+
+import argparse
+import random
+import shutil
+import subprocess
+import timeit
+
+
+def former_filter_git_history(changes):
+    """filter_git_history as it was before the compiled filter"""
+    cleaned_changes = []
+    for line in changes.split('\n'):
+        found = False
+        for ignore_message in IGNORE_COMMIT_MESSAGES:
+            if line.find(ignore_message) != -1:
+                found = True
+                break
+        if not found:
+            cleaned_changes.append(line)
+
+    return '\n'.join(cleaned_changes)
+
+
+def synthetic_repository(path, commits, seed=0):
+    """Create a repository with a linear history tagged on its second commit,
+    1 out of 10 commits is an administrative commit
+    """
+    rng = random.Random(seed)
+    subprocess.run(
+        ['git', 'init', '--quiet', '--initial-branch=main', path], check=True
+    )
+    stream = []
+    for number in range(1, commits + 1):
+        if number % 10 == 0:
+            message = f'{rng.choice(IGNORE_COMMIT_MESSAGES)} {number}'
+        else:
+            message = f'Change number {number} on some module'
+        message = message.encode()
+        stream.append(b'commit refs/heads/main')
+        stream.append(b'mark :%d' % number)
+        stream.append(b'committer Tester <tester@example.com> %d +0000' % number)
+        stream.append(b'data %d' % len(message))
+        stream.append(message)
+        stream.append(b'')
+    stream.append(b'reset refs/tags/1.0')
+    stream.append(b'from :2')
+    stream.append(b'')
+    subprocess.run(
+        ['git', 'fast-import', '--quiet'],
+        cwd=path,
+        input=b'\n'.join(stream),
+        check=True,
+    )
+    return Repo(path)
+
+
+def former(repo, commit_filter):
+    return former_filter_git_history(get_compact_git_history(repo, '1.0', 'main'))
+
+
+def streamed(repo, commit_filter):
+    lines = iter_compact_git_history(repo, '1.0', 'main')
+    return '\n'.join(iter_filtered_git_history(lines, commit_filter))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--commits', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=5)
+    options = parser.parse_args()
+
+    folder = mkdtemp()
+    try:
+        repo = synthetic_repository(folder, options.commits)
+        commit_filter = compile_commit_filter()
+        history = streamed(repo, commit_filter)
+        assert history and history == former(repo, commit_filter)
+
+        timings = {}
+        for name, function in (('former', former), ('streamed', streamed)):
+            timings[name] = min(
+                timeit.repeat(
+                    lambda: function(repo, commit_filter),
+                    number=1,
+                    repeat=options.repeat,
+                )
+            )
+        repo.close()
+    finally:
+        shutil.rmtree(folder)
+
+    print(f'{options.commits} commits')  # noqa: T201
+    print(f'former:   {timings["former"] * 1000:8.2f} ms')  # noqa: T201
+    print(f'streamed: {timings["streamed"] * 1000:8.2f} ms')  # noqa: T201
+    print(f'speedup:  {timings["former"] / timings["streamed"]:8.2f}x')  # noqa: T201
+
+
+if __name__ == '__main__':
+    main()
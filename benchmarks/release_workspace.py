@@ -0,0 +1,328 @@
+"""Time every phase of a full release on a synthetic buildout workspace
+
+A workspace is a buildout repository (sources.cfg, buildout.cfg,
+versions.cfg, release.cfg) with N distributions on src/, each of them a
+clone of its own local bare repository that stands in for the remote.
+Half of the distributions have commits (and news entries) since their last
+tag, every tenth one depends on the previous one.
+
+Run it with::
+
+    python benchmarks/release_workspace.py [--sizes 10 100 1000]
+        [--history 50] [--modes offline test] [--output results.json]
+
+Modes:
+
+- offline: FullRelease in --offline mode, no fetches
+- test: FullRelease in --test mode, fetching from the local remotes
+- release: an actual release of every distribution that needs one,
+  pushing to the local remotes (cfg files are not pushed to any server);
+  the zest.releaser hooks installed run as well, except the ones listed on
+  SKIPPED_HOOKS (e.g. plone.releaser's coredev ones, which only work on a
+  buildout.coredev checkout), a run that fails is recorded with its error
+
+Workspaces are created on a temporary folder, use --keep to keep them.
+"""
+
+from freitag.releaser.release import FullRelease
+from freitag.releaser.utils import wrap_folder
+from tempfile import mkdtemp
+from unittest import mock
+from zest.releaser import utils as zest_utils
+
+import argparse
+import json
+import logging
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import time
+
+
+#: zest.releaser entry point hooks that can not work on the workspace
+SKIPPED_HOOKS = (
+    'plone.releaser.release:update_core',
+    'plone.releaser.release:update_other_core_branches',
+)
+
+#: loaded by the zest.releaser worker processes (see PYTHONPATH on
+#: run_phases), hooks are entry points, they can only be skipped in-process
+SITECUSTOMIZE = f"""
+from importlib.metadata import entry_points
+from zest.releaser import utils
+
+SKIPPED_HOOKS = {SKIPPED_HOOKS!r}
+
+
+def workspace_entry_points(**kwargs):
+    return [
+        entry_point
+        for entry_point in entry_points(**kwargs)
+        if entry_point.value not in SKIPPED_HOOKS
+    ]
+
+
+utils.entry_points = workspace_entry_points
+"""
+
+
+def git(*args, cwd=None, stdin=None):
+    subprocess.run(
+        ['git', *args],
+        input=stdin,
+        cwd=cwd,
+        check=True,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def pyproject(name, dependencies):
+    requirements = ', '.join(f'"{dependency}"' for dependency in dependencies)
+    return (
+        '[build-system]\n'
+        'requires = ["setuptools"]\n'
+        'build-backend = "setuptools.build_meta"\n'
+        '\n'
+        '[project]\n'
+        f'name = "{name}"\n'
+        'version = "1.1.dev0"\n'
+        f'dependencies = [{requirements}]\n'
+        '\n'
+        '[tool.towncrier]\n'
+        'directory = "news/"\n'
+        'filename = "CHANGES.md"\n'
+        'start_string = "<!-- towncrier release notes start -->\\n"\n'
+        '\n'
+        '# tag and push, but do not build nor upload anything\n'
+        '[tool.zest-releaser]\n'
+        'release = false\n'
+    )
+
+
+SETUP_PY = 'from setuptools import setup\n\nsetup()\n'
+
+
+def _fast_import_file(path, contents):
+    data = contents.encode()
+    return [b'M 100644 inline ' + path.encode(), b'data %d' % len(data), data]
+
+
+def create_origin(path, name, history, pending, dependencies):
+    """Create a bare repository with a linear history and a 1.0 tag
+
+    :param pending: if there are commits, and news entries, after the tag
+    """
+    git('init', '--quiet', '--bare', '--initial-branch=main', path)
+    tagged = history // 2 if pending else history
+    stream = []
+    for number in range(1, history + 1):
+        message = f'Change {number} on {name}'.encode()
+        stream.append(b'commit refs/heads/main')
+        stream.append(b'mark :%d' % number)
+        stream.append(b'committer Tester <tester@example.com> %d +0000' % number)
+        stream.append(b'data %d' % len(message))
+        stream.append(message)
+        if number == 1:
+            stream += _fast_import_file('pyproject.toml', pyproject(name, dependencies))
+            stream += _fast_import_file(
+                'CHANGES.md', '# Changelog\n\n<!-- towncrier release notes start -->\n'
+            )
+            stream += _fast_import_file('news/.gitkeep', '')
+            stream += _fast_import_file('setup.py', SETUP_PY)
+            stream += _fast_import_file('MANIFEST.in', 'include *.md\ngraft news\n')
+        stream += _fast_import_file(f'{name.replace(".", "_")}.py', f'# {number}\n')
+        if pending and number > tagged:
+            stream += _fast_import_file(
+                f'news/{number}.feature', f'Change {number} @tester\n'
+            )
+        stream.append(b'')
+    stream.append(b'reset refs/tags/1.0')
+    stream.append(b'from :%d' % tagged)
+    stream.append(b'')
+    git('fast-import', '--quiet', cwd=path, stdin=b'\n'.join(stream))
+
+
+def create_workspace(root, distributions, history):
+    """Create a buildout workspace with the given amount of distributions
+
+    :return: path to the buildout repository
+    :rtype: str
+    """
+    origins = os.path.join(root, 'origins')
+    buildout = os.path.join(root, 'buildout')
+    os.makedirs(os.path.join(buildout, 'src'))
+
+    names = [f'bench.distribution{number:04d}' for number in range(distributions)]
+    for number, name in enumerate(names):
+        origin = os.path.join(origins, f'{name}.git')
+        dependencies = [names[number - 1]] if number and number % 10 == 0 else []
+        create_origin(origin, name, history, number % 2 == 0, dependencies)
+        git('clone', '--quiet', origin, os.path.join(buildout, 'src', name))
+
+    deployment = os.path.join(origins, 'deployment.git')
+    git('init', '--quiet', '--bare', '--initial-branch=main', deployment)
+    stream = [b'commit refs/heads/main', b'committer Tester <t@t> 1 +0000', b'data 4']
+    stream += [b'Init']
+    stream += _fast_import_file(
+        'components/plone/versions/versions.cfg', '[versions]\n'
+    )
+    stream.append(b'')
+    git('fast-import', '--quiet', cwd=deployment, stdin=b'\n'.join(stream))
+
+    sources = ['[sources]']
+    sources += [f'{name} = git file://{origins}/{name}.git' for name in names]
+    sources.append(f'deployment = git file://{deployment}')
+    files = {
+        'sources.cfg': '\n'.join(sources) + '\n',
+        'buildout.cfg': '[buildout]\nauto-checkout =\n    '
+        + '\n    '.join(names)
+        + '\n',
+        'versions.cfg': '[versions]\n' + ''.join(f'{name} = 1.0\n' for name in names),
+        'release.cfg': '[eggs]\nservers =\n    user@localhost:/tmp\n',
+        'qa.cfg': '[buildout]\n',
+    }
+    for filename, contents in files.items():
+        with open(os.path.join(buildout, filename), 'w') as cfg_file:
+            cfg_file.write(contents)
+    with open(os.path.join(buildout, '.gitignore'), 'w') as ignore_file:
+        ignore_file.write('src/\n')
+
+    buildout_origin = os.path.join(origins, 'buildout.git')
+    git('init', '--quiet', '--bare', '--initial-branch=main', buildout_origin)
+    git('init', '--quiet', '--initial-branch=main', cwd=buildout)
+    git('add', '.', cwd=buildout)
+    git('commit', '--quiet', '-m', 'Workspace', cwd=buildout)
+    git('remote', 'add', 'origin', buildout_origin, cwd=buildout)
+    git('push', '--quiet', '-u', 'origin', 'main', cwd=buildout)
+    return buildout
+
+
+class Timer:
+    def __init__(self):
+        self.phases = {}
+
+    def __call__(self, phase, function, *args):
+        start = time.perf_counter()
+        try:
+            return function(*args)
+        finally:
+            self.phases[phase] = round(time.perf_counter() - start, 4)
+
+
+def skip_hooks(root):
+    """Skip SKIPPED_HOOKS on the worker processes started from now on
+
+    :return: the environment variables to set
+    :rtype: dict
+    """
+    folder = os.path.join(root, 'hooks')
+    os.makedirs(folder, exist_ok=True)
+    with open(os.path.join(folder, 'sitecustomize.py'), 'w') as sitecustomize:
+        sitecustomize.write(SITECUSTOMIZE)
+    python_path = [folder, os.environ.get('PYTHONPATH', '')]
+    return {'PYTHONPATH': os.pathsep.join(filter(None, python_path))}
+
+
+def run_phases(buildout, mode, jobs, mirrors_folder):
+    """Run each phase of FullRelease.__call__ on its own and time it"""
+    timer = Timer()
+    with wrap_folder(buildout):
+        release = FullRelease(
+            path='src',
+            test=mode != 'release',
+            offline=mode == 'offline',
+            jobs=jobs,
+            mirrors_folder=mirrors_folder,
+        )
+        try:
+            timer('discovery', release.get_all_distributions)
+            timer('filter', release.filter_distros)
+            if not release.offline:
+                timer('parent', release.check_parent_repo_changes)
+                timer('fetch', release.check_pending_local_changes)
+            timer('history', release.check_changes_to_be_released)
+            timer('changelog', release.ask_what_to_release)
+            if mode == 'release':
+                timer('bump', release.decide_versions)
+                timer('branches', release.check_branches)
+                timer('release', release.release_all)
+                release._create_commit_message()
+                timer('buildout', release.update_buildout)
+                timer('batou', release.update_batou)
+        finally:
+            release.session.close()
+
+        if mode != 'release':
+            # the whole pipeline, as the r command runs it
+            release = FullRelease(
+                path='src', test=True, offline=mode == 'offline', jobs=jobs
+            )
+            timer('total', release)
+    return timer.phases
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--history', type=int, default=50)
+    parser.add_argument(
+        '--modes',
+        nargs='+',
+        choices=('offline', 'test', 'release'),
+        default=['offline', 'test'],
+    )
+    parser.add_argument('--jobs', type=int, default=8)
+    parser.add_argument('--output', default='release_workspace.json')
+    parser.add_argument('--keep', action='store_true')
+    options = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    # the synthetic distributions do not exist on PyPI
+    os.environ['PLONE_RELEASER_CHECK_PYPI_ACCESS'] = '0'
+    # accept the default answer to every question
+    zest_utils.AUTO_RESPONSE = True
+
+    results = {
+        'python': sys.version.split()[0],
+        'platform': platform.platform(),
+        'history': options.history,
+        'jobs': options.jobs,
+        'runs': [],
+    }
+    for size in options.sizes:
+        for mode in options.modes:
+            root = mkdtemp(prefix=f'freitag-bench-{size}-')
+            start = time.perf_counter()
+            buildout = create_workspace(root, size, options.history)
+            setup = time.perf_counter() - start
+            run = {'distributions': size, 'mode': mode, 'setup': round(setup, 4)}
+            environment = skip_hooks(root) if mode == 'release' else {}
+            # no need to wait before releasing
+            with (
+                mock.patch('freitag.releaser.release.time.sleep'),
+                mock.patch.dict(os.environ, environment),
+            ):
+                try:
+                    run['phases'] = run_phases(
+                        buildout, mode, options.jobs, os.path.join(root, 'mirrors')
+                    )
+                except Exception as error:  # noqa: B902
+                    run['error'] = repr(error)
+            results['runs'].append(run)
+            print(json.dumps(run))  # noqa: T201
+            if options.keep:
+                print(f'Workspace kept at {root}')  # noqa: T201
+            else:
+                shutil.rmtree(root)
+
+    with open(options.output, 'w') as output:
+        json.dump(results, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
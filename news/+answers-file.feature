@@ -0,0 +1,3 @@
+Add `freitag_manage r --answers-file FILE` (JSON or .cfg) to decide beforehand
+which distributions are released, and with which version bump, so that a
+release can run unattended @gforcada
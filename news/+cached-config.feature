@@ -0,0 +1,2 @@
+Read sources.cfg, buildout.cfg, versions.cfg and release.cfg only when needed,
+and only once for as long as they do not change @gforcada
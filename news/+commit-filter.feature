@@ -0,0 +1,3 @@
+Filter administrative commits out of the git history with a single compiled
+expression, more commit messages to ignore can be added on `release.cfg`
+(`ignore-commit-messages` on the `history` section) @gforcada
@@ -0,0 +1,2 @@
+Only push the cfg files that changed since they were last pushed, use
+`freitag_manage push --force` to push all of them anyway @gforcada
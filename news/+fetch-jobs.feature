@@ -0,0 +1,2 @@
+Fetch all distributions concurrently before checking for pending local changes,
+the amount of parallel fetches can be set with `--jobs` @gforcada
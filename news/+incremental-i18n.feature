@@ -0,0 +1,3 @@
+Only check, on the `i18n` prerelease hook, the templates changed since the
+last tag that were not found to be fine already, and stop `i18ndude` after
+`FREITAG_RELEASER_I18N_TIMEOUT` seconds (300 by default) @gforcada
@@ -0,0 +1,2 @@
+Start `freitag_manage` faster: `news` and `push` no longer import git,
+zest.releaser nor plone.releaser @gforcada
@@ -0,0 +1,2 @@
+Keep a mirror of the deployment repository in the user cache folder,
+so that updating batou does not clone it from scratch on every release @gforcada
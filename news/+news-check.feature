@@ -0,0 +1,3 @@
+Check the news entries of all distributions concurrently on `freitag_manage news`,
+caching the folders that did not change, exiting with an error if any entry
+is invalid and optionally printing a JSON summary (`--json-output`) @gforcada
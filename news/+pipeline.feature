@@ -0,0 +1,2 @@
+Review each distribution as soon as its own checks are done, instead of
+waiting for all distributions to be fetched and checked first @gforcada
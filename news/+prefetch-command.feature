@@ -0,0 +1,3 @@
+Add `freitag_manage prefetch` to fetch all repositories ahead of a release,
+once or every `--interval` seconds, and `freitag_manage r --fresh SECONDS` to
+not fetch again the ones fetched that recently @gforcada
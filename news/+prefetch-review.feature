@@ -0,0 +1,2 @@
+Prepare the git history and news entries of the next distributions while
+waiting for the answer about the current one @gforcada
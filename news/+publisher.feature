@@ -0,0 +1,2 @@
+Push the cfg files over pooled SSH connections to all the servers
+configured on `release.cfg` at the same time, reporting how each one went @gforcada
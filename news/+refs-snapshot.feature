@@ -0,0 +1,2 @@
+Read all branches and tags of a repository with a single `git for-each-ref`
+when checking if it needs a release @gforcada
@@ -0,0 +1,3 @@
+Remember which distributions need a release, and their git history, in an
+index file on the buildout root, and only check again the ones whose branch or
+tags changed @gforcada
@@ -0,0 +1,2 @@
+Add `freitag_manage r --format json|ndjson` to print, for each distribution,
+its last tag, pending commits, history and news entries @gforcada
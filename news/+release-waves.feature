@@ -0,0 +1,2 @@
+Release distributions that do not depend on each other at the same time, each
+one on its own process @gforcada
@@ -0,0 +1,2 @@
+Run zest.releaser on its own process for each distribution, with its output
+prefixed by the distribution name @gforcada
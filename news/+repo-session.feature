@@ -0,0 +1,2 @@
+Reuse a single git repository object per distribution during a run and fetch
+each of them at most once @gforcada
@@ -0,0 +1,2 @@
+Add `freitag_manage r --shard I/N` to only check a shard of the distributions,
+and `freitag_manage merge` to combine the release plans of all shards @gforcada
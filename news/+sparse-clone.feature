@@ -0,0 +1,2 @@
+Update batou with a partial, sparse clone of the deployment repository
+that only checks out `versions.cfg` @gforcada
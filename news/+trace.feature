@@ -0,0 +1,2 @@
+Write how long each phase, and each git, network or zest.releaser operation,
+took with `freitag_manage r --trace FILE` (Chrome trace event format) @gforcada
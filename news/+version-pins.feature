@@ -0,0 +1,2 @@
+Write all new version pins on `versions.cfg` (and batou's) at once,
+atomically and keeping comments and order @gforcada
@@ -0,0 +1,126 @@
+"""Answers, given beforehand, to the questions asked during a release
+
+So that a release can run unattended. Answers can be given as JSON::
+
+    {
+        "continue": true,
+        "distributions": {
+            "my.distribution": {"release": true, "bump": "feature"},
+            "other.distribution": {"release": false}
+        }
+    }
+
+or as a .cfg file::
+
+    [freitag.releaser]
+    continue = yes
+
+    [my.distribution]
+    release = yes
+    bump = feature
+
+    [other.distribution]
+    release = no
+
+continue answers whether to go on even if some distributions have local
+changes, release whether a distribution is released and bump, optional,
+overrides the kind of release that its news entries imply.
+
+Distributions that are not listed are not released.
+"""
+
+from freitag.releaser.dependencies import canonical_name
+
+import configparser
+import json
+import logging
+
+
+logger = logging.getLogger(__name__)
+
+#: kinds of version bumps that can be answered
+BUMPS = ('bugfix', 'feature', 'breaking')
+
+#: section, on .cfg files, for the questions not related to a distribution
+GLOBAL_SECTION = 'freitag.releaser'
+
+
+def _read_json(path):
+    with open(path) as answers_file:
+        data = json.load(answers_file)
+    return data.get('continue', False), data.get('distributions', {})
+
+
+def _read_cfg(path):
+    config = configparser.ConfigParser()
+    with open(path) as answers_file:
+        config.read_file(answers_file)
+    proceed = config.getboolean(GLOBAL_SECTION, 'continue', fallback=False)
+    distributions = {}
+    for section in config.sections():
+        if section == GLOBAL_SECTION:
+            continue
+        distributions[section] = {
+            'release': config.getboolean(section, 'release', fallback=False),
+            'bump': config.get(section, 'bump', fallback=None),
+        }
+    return proceed, distributions
+
+
+class Answers:
+    """Answers for an unattended release, read from a JSON or .cfg file
+
+    :param path: path to the answers file, JSON if it ends with .json
+    :type path: str
+    :raises: OSError if the file can not be read, ValueError if it is not
+      valid
+    """
+
+    def __init__(self, path):
+        self.path = path
+        if path.endswith('.json'):
+            self.proceed, distributions = _read_json(path)
+        else:
+            self.proceed, distributions = _read_cfg(path)
+
+        self.distributions = {}
+        for name, answers in distributions.items():
+            if isinstance(answers, bool):
+                answers = {'release': answers}
+            bump = answers.get('bump')
+            if bump is not None and bump not in BUMPS:
+                raise ValueError(
+                    f'{path}: {bump} is not valid for {name}. '
+                    f'Valid bumps are: {BUMPS}'
+                )
+            self.distributions[canonical_name(name)] = {
+                'release': bool(answers.get('release', False)),
+                'bump': bump,
+            }
+
+    def confirm(self, distribution=None):
+        """Answer a yes/no question
+
+        :param distribution: name of the distribution the question is about,
+          None for the questions about the whole release
+        :type distribution: str
+        :rtype: bool
+        """
+        if distribution is None:
+            return bool(self.proceed)
+        answers = self.distributions.get(canonical_name(distribution))
+        if answers is None:
+            logger.debug(f'{distribution} is not on {self.path}')
+            return False
+        return answers['release']
+
+    def bump(self, distribution):
+        """Kind of release the given distribution should get
+
+        :param distribution: name of the distribution
+        :type distribution: str
+        :return: one of BUMPS, or None if it was not answered
+        :rtype: str
+        """
+        answers = self.distributions.get(canonical_name(distribution), {})
+        return answers.get('bump')
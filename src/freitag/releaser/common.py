@@ -0,0 +1,144 @@
+"""Helpers that need neither git nor the release machinery
+
+They are kept apart from freitag.releaser.utils so that the commands that
+do not release anything (e.g. freitag_manage news) start fast.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+
+import configparser
+import logging
+import os
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+#: results of cached_by_mtime, keyed by factory and paths
+_mtime_cache = {}
+_mtime_cache_lock = threading.Lock()
+
+
+def configure_logging(debug):
+    if debug:
+        level = logging.DEBUG
+    else:
+        level = logging.INFO
+    logging.basicConfig(level=level, format='%(message)s')
+
+
+def iter_concurrently(function, items, jobs=8):
+    """Call the given function with each item concurrently
+
+    Results are yielded in the same order as the given items: each one as
+    soon as its own call, and the ones of all the items before it, finish.
+    Results of later items that finish earlier are kept until then.
+
+    :param function: what to call with each item
+    :type function: callable
+    :param items: the items to call the function with
+    :type items: iterable
+    :param jobs: how many calls can run at the same time
+    :type jobs: int
+    :return: pairs of item and the result of calling the function with it
+    :rtype: generator
+    :raises: whatever the function raises
+    """
+    executor = ThreadPoolExecutor(max_workers=max(jobs, 1))
+    try:
+        futures = [(item, executor.submit(function, item)) for item in items]
+        for item, future in futures:
+            yield item, future.result()
+    finally:
+        # do not wait for calls that were not even started
+        executor.shutdown(cancel_futures=True)
+
+
+def _file_version(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def cached_by_mtime(factory, *paths):
+    """Get what calling factory with the given paths returns, memoised
+
+    The result is kept for the lifetime of the process, it is only computed
+    again if any of the files is modified, created or removed meanwhile.
+
+    :param factory: what reads the files, it gets the absolute paths
+    :type factory: callable
+    :param paths: path to each file that the factory reads
+    :type paths: str
+    :return: whatever the factory returns
+    """
+    paths = tuple(os.path.abspath(path) for path in paths)
+    key = (factory, paths)
+    versions = tuple(_file_version(path) for path in paths)
+    with _mtime_cache_lock:
+        cached = _mtime_cache.get(key)
+    if cached is not None and cached[0] == versions:
+        return cached[1]
+    value = factory(*paths)
+    with _mtime_cache_lock:
+        _mtime_cache[key] = (versions, value)
+    return value
+
+
+def _read_config(path):
+    config = configparser.ConfigParser()
+    with open(path) as config_file:
+        config.read_file(config_file)
+    return config
+
+
+def read_config(path):
+    """Parse the given configuration file, once for as long as it is unchanged
+
+    :param path: path to the configuration file
+    :type path: str
+    :return: the parsed configuration, it is shared, do not modify it
+    :rtype: configparser.ConfigParser
+    :raises: OSError if the file can not be read
+    """
+    return cached_by_mtime(_read_config, path)
+
+
+def cache_folder():
+    """Where freitag.releaser keeps its caches across runs
+
+    :rtype: str
+    """
+    cache = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(cache, 'freitag.releaser')
+
+
+def get_servers(section):
+    """Get the server details for the given section
+
+    This is a generic way to get a connection string without having to define it
+    here in the source code.
+    """
+    servers = []
+    try:
+        connection_strings = read_config('release.cfg').get(section, 'servers')
+        for connection in connection_strings.strip().split('\n'):
+            servers.append(_server_details(connection))
+    except ValueError:
+        logger.info('Something went wrong trying to get the connection string')
+        raise
+
+    return servers
+
+
+def _server_details(line):
+    if '@' not in line:
+        raise ValueError(f'No user/server on {line}')
+    user, server = line.strip().split('@')
+
+    if ':' not in server:
+        raise ValueError(f'No server/path on {line}')
+    server, path = server.split(':')
+    return user, server, path
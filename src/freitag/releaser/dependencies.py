@@ -0,0 +1,134 @@
+from glob import glob
+
+import configparser
+import logging
+import os
+import re
+import tomllib
+
+
+logger = logging.getLogger(__name__)
+
+REQUIREMENT_NAME_RE = re.compile(r'\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+
+def canonical_name(name):
+    """Normalize a distribution name, as PEP 503 does
+
+    :param name: the name of a distribution
+    :type name: str
+    :rtype: str
+    """
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def _requirement_names(requirements):
+    names = set()
+    for requirement in requirements:
+        matches = REQUIREMENT_NAME_RE.match(requirement)
+        if matches:
+            names.add(canonical_name(matches.group(1)))
+    return names
+
+
+def _from_pyproject(path):
+    with open(os.path.join(path, 'pyproject.toml'), 'rb') as pyproject_file:
+        project = tomllib.load(pyproject_file).get('project', {})
+    if 'name' not in project:
+        raise ValueError('No [project] metadata')
+    return project['name'], project.get('dependencies', [])
+
+
+def _from_setup_cfg(path):
+    config = configparser.ConfigParser()
+    if not config.read(os.path.join(path, 'setup.cfg')):
+        raise OSError('No setup.cfg')
+    name = config.get('metadata', 'name')
+    requirements = config.get('options', 'install_requires', fallback='')
+    return name, requirements.strip().split('\n')
+
+
+def _from_egg_info(path):
+    egg_infos = glob(os.path.join(path, '*.egg-info')) + glob(
+        os.path.join(path, 'src', '*.egg-info')
+    )
+    if not egg_infos:
+        raise OSError('No egg-info')
+    name = os.path.basename(egg_infos[0])[: -len('.egg-info')]
+    requirements = []
+    try:
+        with open(os.path.join(egg_infos[0], 'requires.txt')) as requires_file:
+            for line in requires_file:
+                # extras and environment markers come on their own sections
+                if line.startswith('['):
+                    break
+                requirements.append(line)
+    except OSError:
+        pass
+    return name, requirements
+
+
+def get_requirements(path):
+    """Get the name and install requirements of the distribution on path
+
+    They are looked for on pyproject.toml, setup.cfg and, as setup.py can
+    not be read without running it, on the egg-info folder that buildout
+    creates when developing the distribution.
+
+    If nothing can be found the folder name is used as distribution name.
+
+    :param path: where the distribution is
+    :type path: str
+    :return: the canonical name and the canonical names of its requirements
+    :rtype: tuple of str and set
+    """
+    for reader in (_from_pyproject, _from_setup_cfg, _from_egg_info):
+        try:
+            name, requirements = reader(path)
+        except (OSError, ValueError, configparser.Error):
+            continue
+        return canonical_name(name), _requirement_names(requirements)
+
+    logger.debug(f'No requirements found for {path}')
+    return canonical_name(os.path.basename(os.path.normpath(path))), set()
+
+
+def release_waves(distributions):
+    """Group the given distributions so that each one is released only
+    after all the other distributions it depends on
+
+    Distributions within a wave do not depend on each other, so they can be
+    released at the same time.
+
+    :param distributions: paths to the distributions
+    :type distributions: list of str
+    :return: waves of distribution paths, each of them sorted
+    :rtype: list of lists
+    :raises: ValueError if there are circular dependencies
+    """
+    names = {}
+    requirements = {}
+    for path in distributions:
+        name, path_requirements = get_requirements(path)
+        names[name] = path
+        requirements[path] = path_requirements
+
+    # only the dependencies between the distributions to be released matter
+    pending = {
+        path: {names[name] for name in requirements[path] if name in names} - {path}
+        for path in distributions
+    }
+    waves = []
+    while pending:
+        wave = sorted(path for path, depends_on in pending.items() if not depends_on)
+        if not wave:
+            raise ValueError(
+                f'Circular dependencies between: {", ".join(sorted(pending))}'
+            )
+        waves.append(wave)
+        for path in wave:
+            del pending[path]
+        for depends_on in pending.values():
+            depends_on.difference_update(wave)
+
+    return waves
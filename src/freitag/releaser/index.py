@@ -0,0 +1,98 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+
+class ReleaseIndex:
+    """On-disk index of what each distribution needs to be released
+
+    Each entry is stored together with the key it was computed for (usually
+    a freitag.releaser.utils.get_refs_fingerprint result), as soon as the
+    key changes the entry is considered outdated.
+
+    Without a path the index is only kept in memory.
+
+    It can be safely used from multiple threads.
+    """
+
+    #: version of the on-disk format, bump it to discard old indexes
+    version = 1
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = {}
+        self._changed = False
+        self._lock = threading.RLock()
+        self.load()
+
+    def load(self):
+        """Read the index from disk, an unreadable index is discarded"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as index_file:
+                data = json.load(index_file)
+        except (OSError, ValueError):
+            logger.debug(f'{self.path} could not be read, ignoring it')
+            return
+        if data.get('version') == self.version:
+            self._entries = data.get('entries', {})
+
+    def save(self):
+        """Write the index to disk, if anything changed"""
+        with self._lock:
+            if not self.path or not self._changed:
+                return
+            folder = os.path.dirname(os.path.abspath(self.path))
+            with tempfile.NamedTemporaryFile(
+                'w', dir=folder, prefix='.index-', delete=False
+            ) as tmp_file:
+                json.dump(
+                    {'version': self.version, 'entries': self._entries},
+                    tmp_file,
+                    indent=2,
+                    sort_keys=True,
+                )
+            os.replace(tmp_file.name, self.path)
+            self._changed = False
+
+    def get(self, name, key):
+        """Get the entry of the given distribution
+
+        :param name: the distribution
+        :type name: str
+        :param key: what the entry has to have been computed for
+        :type key: dict
+        :return: the entry data or None if there is no up to date entry
+        :rtype: dict
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry['key'] != key:
+                return None
+            return entry['data']
+
+    def set(self, name, key, **data):
+        """Store a new entry for the given distribution
+
+        :return: the entry data
+        :rtype: dict
+        """
+        with self._lock:
+            self._entries[name] = {'key': key, 'data': data}
+            self._changed = True
+        return data
+
+    def update(self, name, key, **data):
+        """Add data to an up to date entry, if there is any"""
+        with self._lock:
+            entry = self.get(name, key)
+            if entry is None:
+                return
+            entry.update(data)
+            self._changed = True
@@ -1,16 +1,40 @@
+"""freitag_manage command line
+
+git, zest.releaser, plone.releaser and paramiko take a noticeable time to
+be imported and most commands do not need them at all, so the modules that
+use them are only imported by the commands that do, when they run.
+"""
+
 from argh import arg
 from argh import ArghParser
 from argh.decorators import named
-from freitag.releaser.release import FullRelease
-from freitag.releaser.utils import configure_logging
-from freitag.releaser.utils import get_servers
-from freitag.releaser.utils import push_cfg_files
+from freitag.releaser.common import configure_logging
+from freitag.releaser.common import get_servers
+from freitag.releaser.index import ReleaseIndex
+from freitag.releaser.news import check_news_folders
+from freitag.releaser.news import find_distributions
+from freitag.releaser.plan import FORMATS
+from freitag.releaser.plan import merge_plans
+from freitag.releaser.plan import parse_shard
+from freitag.releaser.plan import PlanWriter
+from freitag.releaser.tracing import Tracer
 
+import json
+import logging
 import os
+import sys
+import time
+
+
+logger = logging.getLogger(__name__)
 
 
 @named('r')
+@arg('-t', '--test')
 @arg('-f', '--filter-distributions', nargs='*')
+@arg('-o', '--offline')
+@arg('--format', dest='output_format', choices=FORMATS)
+@arg('--shard', type=parse_shard)
 def full_release(
     path='src',
     test=False,
@@ -18,6 +42,14 @@ def full_release(
     debug=False,
     offline=False,
     branch='main',
+    jobs=8,
+    index_file='.releaser-index.json',
+    mirrors_folder=None,
+    trace=None,
+    fresh=0,
+    output_format=None,
+    shard=None,
+    answers_file=None,
 ):
     """Release all distribution found on src/
 
@@ -36,43 +68,188 @@ def full_release(
     :type offline: bool
     :param branch: which branch should be used as a base for comparison
     :type branch: string
+    :param jobs: how many distributions are fetched, or released, concurrently
+    :type jobs: int
+    :param index_file: where to remember which distributions need a release
+      across runs (pass an empty string to not use it)
+    :type index_file: str
+    :param mirrors_folder: where to keep mirrors of the repositories that are
+      cloned during the release, defaults to the user cache folder (pass an
+      empty string to always clone them from scratch)
+    :type mirrors_folder: str
+    :param trace: write how long each phase, and each git or network
+      operation, took on this file (Chrome trace event format)
+    :type trace: str
+    :param fresh: do not fetch the repositories that were fetched less than
+      these many seconds ago (see the prefetch command)
+    :type fresh: int
+    :param output_format: print a record for each distribution, as JSON or
+      as one JSON document per line (ndjson) as soon as each one is checked,
+      rather than asking what to release (turns test on as well)
+    :type output_format: str
+    :param shard: only check the I-th out of N shards of the distributions,
+      as I/N, use the merge command to combine the plans of all shards
+      (turns test on as well)
+    :type shard: str
+    :param answers_file: JSON or .cfg file with the answers to the questions
+      that would be otherwise asked, so the release can run unattended (see
+      freitag.releaser.answers)
+    :type answers_file: str
     """
+    from freitag.releaser.release import FullRelease
+    from freitag.releaser.utils import default_mirrors_folder
+
     configure_logging(debug)
     get_servers('eggs')
+    if mirrors_folder is None:
+        mirrors_folder = default_mirrors_folder()
     release_all = FullRelease(
         path=path,
         test=test,
         filter_distributions=filter_distributions,
         offline=offline,
         branch=branch,
+        jobs=jobs,
+        index_file=index_file,
+        mirrors_folder=mirrors_folder or None,
+        tracer=Tracer(enabled=bool(trace)),
+        fresh=fresh,
+        output_format=output_format,
+        shard=shard,
+        answers_file=answers_file,
     )
-    release_all()
+    try:
+        release_all()
+    finally:
+        if trace:
+            release_all.tracer.write(trace)
+            logger.info(f'Trace written on {trace}')
+
+
+@named('merge')
+@arg('plans', nargs='+')
+@arg('--format', dest='output_format', choices=FORMATS)
+def merge_release_plans(plans, output_format='json'):
+    """Combine the release plans of each shard into a single one
+
+    The result is the same as if all distributions were checked at once.
+
+    :param plans: the plan files written by freitag_manage r --shard
+    :type plans: list
+    :param output_format: json or ndjson
+    :type output_format: str
+    """
+    writer = PlanWriter(output_format)
+    for record in merge_plans(plans):
+        writer.write(record)
+    writer.close()
+
+
+@named('prefetch')
+@arg('-f', '--filter-distributions', nargs='*')
+def prefetch_repositories(
+    path='src',
+    filter_distributions=None,
+    debug=False,
+    jobs=8,
+    interval=0,
+):
+    """Fetch all distributions, and the parent repository, ahead of a release
+
+    Combined with the r command fresh option, the release does not need to
+    wait for the network.
+
+    :param path: where to look for distributions
+    :type path: str
+    :param filter_distributions: only distributions that match the given
+      string will be fetched (multiples can be specified space-separated)
+    :type filter_distributions: str
+    :param debug: controls how much output is shown to the user
+    :type debug: bool
+    :param jobs: how many repositories are fetched concurrently
+    :type jobs: int
+    :param interval: keep fetching them every these many seconds, until
+      interrupted (0 fetches them only once)
+    :type interval: int
+    """
+    from freitag.releaser.release import FullRelease
+
+    configure_logging(debug)
+    while True:
+        release = FullRelease(
+            path=path, filter_distributions=filter_distributions, jobs=jobs
+        )
+        try:
+            release.prefetch()
+        finally:
+            release.session.close()
+        if not interval:
+            break
+        time.sleep(interval)
 
 
 @named('push')
-def publish_cfg_files(debug=False):
+def publish_cfg_files(debug=False, force=False):
     """Push buildout .cfg files on a remote server
 
     :param debug: controls how much output is shown to the user
     :type debug: bool
+    :param force: push all files, even the ones that did not change
+    :type force: bool
     """
+    from freitag.releaser.publisher import push_cfg_files
+
     configure_logging(debug)
     get_servers('eggs')
-    push_cfg_files()
+    try:
+        push_cfg_files(force=force)
+    except OSError as error:
+        logger.error(str(error))
+        sys.exit(1)
 
 
 @named('news')
-def check_newsentries(debug=False):
+def check_newsentries(
+    path='src',
+    debug=False,
+    jobs=8,
+    cache_file='.releaser-news.json',
+    json_output=False,
+):
     """Verify that all news entries are fine
 
+    Exits with a non-zero status code if any news entry is not valid.
+
+    :param path: where to look for distributions
+    :type path: str
     :param debug: controls how much output is shown to the user
     :type debug: bool
+    :param jobs: how many news folders are checked concurrently
+    :type jobs: int
+    :param cache_file: where to remember the news folders that were fine and
+      did not change since (pass an empty string to not use it)
+    :type cache_file: str
+    :param json_output: print a summary of the invalid news entries as JSON
+    :type json_output: bool
     """
     configure_logging(debug)
-    release = FullRelease(path='src')
-    release.get_all_distributions()
-    for distribution in release.distributions:
-        release.verify_newsentries(os.path.join(distribution, 'news'))
+    news_folders = [
+        os.path.join(distribution, 'news') for distribution in find_distributions(path)
+    ]
+    results = check_news_folders(
+        news_folders, jobs=jobs, cache=ReleaseIndex(cache_file)
+    )
+    invalid = {
+        result['folder']: result['invalid'] for result in results if result['invalid']
+    }
+    if json_output:
+        summary = {'checked': len(results), 'invalid': invalid}
+        print(json.dumps(summary, indent=2, sort_keys=True))  # noqa: T201
+    for folder, entries in invalid.items():
+        for entry in entries:
+            logger.error(f'{folder}/{entry["file"]}: {entry["reason"]}')
+    if invalid:
+        sys.exit(1)
 
 
 class Manage:
@@ -80,6 +257,8 @@ class Manage:
         parser = ArghParser()
         commands = [
             full_release,
+            merge_release_plans,
+            prefetch_repositories,
             publish_cfg_files,
             check_newsentries,
         ]
@@ -0,0 +1,145 @@
+from freitag.releaser.common import iter_concurrently
+
+import logging
+import os
+import re
+
+
+logger = logging.getLogger(__name__)
+
+NEWS_ENTRY_FILENAME_RE = re.compile(r'(\+?[\-\d\w]+).(\w+)(.\d)*')
+
+#: kinds of news entries that towncrier knows about
+VALID_SUFFIXES = ('bugfix', 'feature', 'breaking', 'internal')
+
+#: files on news folders that are not news entries
+IGNORED_FILES = ('.gitkeep', '.changelog_template.jinja')
+
+
+def highest_suffix(current, new):
+    """Get which of the given kinds of news entries implies a bigger release
+
+    :param current: a kind of news entry (see VALID_SUFFIXES)
+    :type current: str
+    :param new: another kind of news entry
+    :type new: str
+    :return: the one that implies a bigger release
+    :rtype: str
+    """
+    suffixes_ordered = ('breaking', 'feature', 'bugfix')
+    for suffix in suffixes_ordered:
+        if current == suffix or new == suffix:
+            return suffix
+
+
+def find_distributions(path):
+    """Get all git repositories found right below the given folder
+
+    Unlike FullRelease.get_all_distributions, it only checks that there is a
+    .git on them, no git.Repo is created.
+
+    :param path: where to look for distributions
+    :type path: str
+    :return: the path to each distribution, sorted
+    :rtype: list
+    """
+    distributions = []
+    with os.scandir(path) as entries:
+        for entry in entries:
+            if entry.is_dir() and os.path.exists(os.path.join(entry.path, '.git')):
+                distributions.append(f'{path}/{entry.name}')
+    return sorted(distributions)
+
+
+def scan_news_folder(news_folder):
+    """Validate all news entries on a news folder
+
+    Files whose name does not look like a news entry at all (e.g.
+    .gitignore) are listed as ignored, only news entries of an unknown
+    kind are invalid.
+
+    :param news_folder: path to the news folder
+    :type news_folder: str
+    :return: the news folder, whether it exists, the valid entries (as
+      [suffix, issue, filename] lists, sorted by filename), the invalid ones
+      (as {'file', 'reason'} dictionaries), the ignored files and the kind
+      of release they imply
+    :rtype: dict
+    """
+    result = {
+        'folder': news_folder,
+        'exists': True,
+        'entries': [],
+        'invalid': [],
+        'ignored': [],
+        'next_release': 'bugfix',
+    }
+    try:
+        with os.scandir(news_folder) as entries:
+            filenames = sorted(entry.name for entry in entries)
+    except OSError:
+        result['exists'] = False
+        return result
+
+    for news_filename in filenames:
+        if news_filename in IGNORED_FILES:
+            continue
+        matches = NEWS_ENTRY_FILENAME_RE.match(news_filename)
+        if not matches:
+            result['ignored'].append(news_filename)
+            continue
+        issue, suffix, _ = matches.groups()
+        if suffix not in VALID_SUFFIXES:
+            result['invalid'].append(
+                {
+                    'file': news_filename,
+                    'reason': f'{suffix} is not valid. '
+                    f'Valid suffixes are: {VALID_SUFFIXES}',
+                }
+            )
+            continue
+        result['entries'].append([suffix, issue, news_filename])
+        result['next_release'] = highest_suffix(result['next_release'], suffix)
+    return result
+
+
+def _cache_key(news_folder):
+    try:
+        stat = os.stat(news_folder)
+    except OSError:
+        return None
+    # the folder modification time changes whenever a file is added,
+    # removed or renamed, which is all that the validation looks at;
+    # bump the version whenever the validation rules change
+    return {'inode': stat.st_ino, 'mtime': stat.st_mtime_ns, 'version': 2}
+
+
+def check_news_folders(news_folders, jobs=8, cache=None):
+    """Validate the news entries of many news folders concurrently
+
+    :param news_folders: paths to news folders
+    :type news_folders: list
+    :param jobs: how many folders are scanned at the same time
+    :type jobs: int
+    :param cache: where to keep the results of folders that did not change
+      since they were last scanned
+    :type cache: freitag.releaser.index.ReleaseIndex
+    :return: one result per folder, sorted (see scan_news_folder)
+    :rtype: list
+    """
+
+    def scan(news_folder):
+        key = _cache_key(news_folder)
+        if cache is not None and key is not None:
+            cached = cache.get(news_folder, key)
+            if cached is not None:
+                return cached
+        result = scan_news_folder(news_folder)
+        if cache is not None and key is not None:
+            cache.set(news_folder, key, **result)
+        return result
+
+    results = [result for _, result in iter_concurrently(scan, news_folders, jobs)]
+    if cache is not None:
+        cache.save()
+    return sorted(results, key=lambda result: result['folder'])
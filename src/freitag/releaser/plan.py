@@ -0,0 +1,132 @@
+"""Machine readable output of what a release would do
+
+One record per distribution, with its last tag, how many commits are
+pending to be released, their (cleaned) history, news entries...
+"""
+
+import json
+import sys
+
+
+#: output formats that PlanWriter knows about
+FORMATS = ('json', 'ndjson')
+
+
+class PlanWriter:
+    """Write one record per distribution to the given stream
+
+    With ndjson each record is written, on its own line, as soon as it is
+    given, with json a single list, sorted by path, is written on close.
+
+    :param output_format: one of FORMATS
+    :type output_format: str
+    :param stream: where to write the records, defaults to sys.stdout
+    :type stream: file
+    :raises: ValueError if the format is not known
+    """
+
+    def __init__(self, output_format, stream=None):
+        if output_format not in FORMATS:
+            raise ValueError(
+                f'{output_format} is not valid. Valid formats are: {FORMATS}'
+            )
+        self.output_format = output_format
+        self._stream = stream
+        self.records = []
+
+    @property
+    def stream(self):
+        return self._stream or sys.stdout
+
+    def write(self, record):
+        """Add the record of a distribution
+
+        :param record: JSON serializable, with at least a 'path' key
+        :type record: dict
+        """
+        if self.output_format == 'ndjson':
+            self.stream.write(json.dumps(record, sort_keys=True) + '\n')
+            self.stream.flush()
+        else:
+            self.records.append(record)
+
+    def close(self):
+        """Write whatever is pending to be written"""
+        if self.output_format == 'json':
+            records = sorted(self.records, key=lambda record: record['path'])
+            self.stream.write(json.dumps(records, indent=2, sort_keys=True) + '\n')
+            self.stream.flush()
+            self.records = []
+
+
+def parse_shard(shard):
+    """Parse a shard specification, like 2/4 (the second out of four)
+
+    :param shard: the shard number, starting at 1, and the total of them
+    :type shard: str
+    :return: shard number and total
+    :rtype: tuple
+    :raises: ValueError if it is not a valid shard
+    """
+    try:
+        number, total = (int(part) for part in shard.split('/'))
+    except ValueError:
+        raise ValueError(f'{shard} is not valid, use I/N, e.g. 1/4') from None
+    if not 1 <= number <= total:
+        raise ValueError(f'{shard} is not valid, it should be within 1/{total}')
+    return number, total
+
+
+def shard_items(items, shard):
+    """Get the items that belong to the given shard
+
+    Items are sorted and dealt round-robin, so that each shard gets a
+    similar amount of them, and all shards together get all of them.
+
+    :param items: what is going to be split
+    :type items: iterable
+    :param shard: shard number, starting at 1, and total, see parse_shard
+    :type shard: tuple
+    :rtype: list
+    """
+    number, total = shard
+    return sorted(items)[number - 1 :: total]
+
+
+def read_plan(path):
+    """Read the records of a plan written with PlanWriter, in any format
+
+    :param path: the plan file
+    :type path: str
+    :rtype: list
+    :raises: ValueError if it is not a plan
+    """
+    with open(path) as plan_file:
+        contents = plan_file.read()
+    try:
+        records = json.loads(contents)
+    except ValueError:
+        # a record per line
+        records = [json.loads(line) for line in contents.splitlines() if line]
+    if isinstance(records, dict):
+        # a single distribution with ndjson
+        records = [records]
+    return records
+
+
+def merge_plans(paths):
+    """Combine the plans of each shard into a single one
+
+    :param paths: the plan files of the shards
+    :type paths: list
+    :return: all records, sorted by path, as a single run would give them
+    :rtype: list
+    :raises: ValueError if a distribution is on more than one plan
+    """
+    records = {}
+    for path in paths:
+        for record in read_plan(path):
+            if record['path'] in records:
+                raise ValueError(f'{record["path"]} on {path} is on another plan')
+            records[record['path']] = record
+    return [records[key] for key in sorted(records)]
@@ -1,35 +1,155 @@
+from freitag.releaser.common import cache_folder
+from freitag.releaser.index import ReleaseIndex
 from zest.releaser.utils import ask
 
+import hashlib
 import logging
 import os
+import re
 import subprocess
 import sys
 
 
 logger = logging.getLogger(__name__)
 
+#: files that i18ndude find-untranslated checks
+TEMPLATE_EXTENSIONS = ('.pt', '.cpt', '.zpt', '.html')
+
+#: environment variable with how many seconds i18ndude can run, 0 or empty
+#: to wait for as long as it takes
+TIMEOUT_VARIABLE = 'FREITAG_RELEASER_I18N_TIMEOUT'
+DEFAULT_TIMEOUT = 300
+
+#: where i18ndude find-untranslated -n reports something, the file name,
+#: line and column, on a line of their own
+REPORTED_FILE_RE = re.compile(r'^(?P<path>.+):\d+:\d+:$', re.MULTILINE)
+
+
+def _git(workingdir, *args):
+    return subprocess.run(
+        ['git', *args],
+        cwd=workingdir,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+
+def _is_template(path):
+    return path.endswith(TEMPLATE_EXTENSIONS)
+
+
+def changed_templates(workingdir, folder='src'):
+    """Get the templates changed since the last tag
+
+    :param workingdir: the distribution being released
+    :type workingdir: str
+    :param folder: where to look for templates, relative to workingdir
+    :type folder: str
+    :return: the templates paths, relative to workingdir, sorted; all of
+      them if there is no tag yet
+    :rtype: list
+    """
+    try:
+        last_tag = _git(workingdir, 'describe', '--tags', '--abbrev=0').strip()
+    except subprocess.CalledProcessError:
+        last_tag = None
+
+    if last_tag:
+        output = _git(
+            workingdir, 'diff', '--name-only', '--no-renames', last_tag, '--', folder
+        )
+        paths = output.splitlines()
+    else:
+        paths = []
+        for root, _, files in os.walk(os.path.join(workingdir, folder)):
+            for filename in files:
+                paths.append(os.path.relpath(os.path.join(root, filename), workingdir))
+
+    return sorted(
+        path
+        for path in paths
+        if _is_template(path) and os.path.exists(os.path.join(workingdir, path))
+    )
+
+
+def _checksum(path):
+    with open(path, 'rb') as a_file:
+        return {'sha256': hashlib.sha256(a_file.read()).hexdigest()}
+
+
+def _timeout():
+    value = os.environ.get(TIMEOUT_VARIABLE)
+    if value is None:
+        return DEFAULT_TIMEOUT
+    if not value.strip():
+        return None
+    try:
+        return float(value) or None
+    except ValueError:
+        logger.warning(f'{TIMEOUT_VARIABLE}={value} is not a number, ignoring it')
+        return DEFAULT_TIMEOUT
+
 
 def check_translations(data):
     """Check that all strings are marked as translatable.
 
+    Only the templates changed since the last tag are checked, and templates
+    that were already found to be fine are not checked again, as long as
+    they do not change.
+
     :param data: information coming from zest.releaser
     :type data: dict
     """
-    path = f'{data["workingdir"]}/bin/i18ndude'
+    workingdir = data['workingdir']
+    path = f'{workingdir}/bin/i18ndude'
     if not os.path.exists(path):
         logger.debug(f'{path} not found, no translation check will be done')
         return
 
+    cache_file = os.path.join(cache_folder(), 'i18n.json')
+    cache = ReleaseIndex(cache_file)
+    templates = {}
+    for template in changed_templates(workingdir):
+        template_path = os.path.abspath(os.path.join(workingdir, template))
+        key = _checksum(template_path)
+        if cache.get(template_path, key) is None:
+            templates[template] = (template_path, key)
+
+    if not templates:
+        logger.debug('i18ndude: no template changed, nothing to check')
+        return
+
     process = subprocess.Popen(
-        ['bin/i18ndude', 'find-untranslated', '-n', 'src/'],
+        ['bin/i18ndude', 'find-untranslated', '-n', *templates],
         stdout=subprocess.PIPE,
+        cwd=workingdir,
     )
-    stdout, stderr = process.communicate()
-    if b'ERROR' not in stdout:
-        logger.debug('i18ndude: everything up to date')
-        return
+    try:
+        stdout, stderr = process.communicate(timeout=_timeout())
+    except subprocess.TimeoutExpired:
+        process.kill()
+        process.communicate()
+        logger.info(f'i18ndude did not finish in time (see {TIMEOUT_VARIABLE})')
+        msg = 'Translations could not be checked, do you want to continue?'
+    else:
+        # remember the templates that i18ndude did not complain about
+        reported = {
+            match.group('path')
+            for match in REPORTED_FILE_RE.finditer(stdout.decode(errors='replace'))
+        }
+        for template, (template_path, key) in templates.items():
+            if template not in reported:
+                cache.set(template_path, key)
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        cache.save()
+
+        if b'ERROR' not in stdout:
+            logger.debug('i18ndude: everything up to date')
+            return
+
+        logger.info(stdout)
+        msg = 'There are strings not marked as translatable, do you want to continue?'
 
-    logger.info(stdout)
-    msg = 'There are strings not marked as translatable, do you want to continue?'
     if not ask(msg, default=False):
         sys.exit(1)
@@ -0,0 +1,288 @@
+"""Upload files to the servers configured on release.cfg
+
+Compared to calling scp once per server, the connections are opened
+in-process, kept open for as long as the publisher is used and all servers
+are uploaded to at the same time.
+
+Next to the uploaded files, each server keeps a manifest with the checksum
+of each of them, files whose checksum did not change are not uploaded again.
+The manifest on each server is the authority on what it has, locally only
+the checksums of files that did not change since are remembered.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from freitag.releaser.common import cache_folder
+from freitag.releaser.common import get_servers
+from freitag.releaser.index import ReleaseIndex
+
+import hashlib
+import io
+import json
+import logging
+import os
+import paramiko
+import posixpath
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+#: configuration files that are published for the CI servers
+CFG_FILES = (
+    'versions.cfg',
+    'release.cfg',
+    'sources.cfg',
+    'qa.cfg',
+)
+
+#: name of the file, next to the uploaded ones, that lists their checksums
+MANIFEST = '.checksums.json'
+
+
+def checksum(path):
+    """Compute the checksum of a file
+
+    :param path: path to the file
+    :type path: str
+    :return: sha256 hex digest of its contents
+    :rtype: str
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as a_file:
+        for chunk in iter(lambda: a_file.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _read_manifest(sftp, path):
+    try:
+        with sftp.open(posixpath.join(path, MANIFEST)) as manifest:
+            data = json.loads(manifest.read())
+    except (OSError, ValueError):
+        # missing or broken, everything will be uploaded
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    return data
+
+
+def _write_manifest(sftp, path, data):
+    remote = posixpath.join(path, MANIFEST)
+    contents = json.dumps(data, indent=2, sort_keys=True).encode()
+    sftp.putfo(io.BytesIO(contents), f'{remote}.tmp')
+    try:
+        sftp.posix_rename(f'{remote}.tmp', remote)
+    except OSError:
+        # the server does not support the OpenSSH extension
+        try:
+            sftp.remove(remote)
+        except OSError:
+            pass
+        sftp.rename(f'{remote}.tmp', remote)
+
+
+class Publisher:
+    """Upload files over SFTP to several servers concurrently
+
+    Each server gets a single SSH connection (with a single SFTP channel)
+    that is reused for every upload until the publisher is closed.
+
+    ~/.ssh/config is honored for the host name, port and identity file,
+    like scp would do, unknown host keys are rejected.
+
+    :param servers: (user, server, path) tuples, see
+      freitag.releaser.common.get_servers
+    :type servers: list
+    :param cache: where to remember the checksum of each file, so that it
+      is not computed again while the file does not change
+    :type cache: freitag.releaser.index.ReleaseIndex
+    """
+
+    def __init__(self, servers, ssh_config_file='~/.ssh/config', cache=None):
+        self.servers = list(servers)
+        self.ssh_config_file = os.path.expanduser(ssh_config_file)
+        self.cache = cache
+        #: SSH clients and their SFTP channels, keyed by (user, server)
+        self._connections = {}
+        #: one lock per server, so that each one is connected only once
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _connect_options(self, user, server):
+        options = {'hostname': server, 'username': user}
+        if not os.path.exists(self.ssh_config_file):
+            return options
+
+        config = paramiko.SSHConfig.from_path(self.ssh_config_file).lookup(server)
+        options['hostname'] = config.get('hostname', server)
+        if 'port' in config:
+            options['port'] = int(config['port'])
+        if 'identityfile' in config:
+            options['key_filename'] = config['identityfile']
+        return options
+
+    def _connect(self, user, server):
+        client = paramiko.SSHClient()
+        client.load_system_host_keys()
+        client.connect(**self._connect_options(user, server))
+        return client, client.open_sftp()
+
+    def checksums(self, files):
+        """Compute the checksum of the given files, reusing the cache
+
+        :param files: local paths of the files
+        :type files: list
+        :return: the checksum of each file
+        :rtype: dict
+        """
+        checksums = {}
+        for filename in files:
+            if self.cache is None:
+                checksums[filename] = checksum(filename)
+                continue
+            stat = os.stat(filename)
+            name = os.path.abspath(filename)
+            key = {'mtime': stat.st_mtime_ns, 'size': stat.st_size}
+            cached = self.cache.get(name, key)
+            if cached is None:
+                cached = self.cache.set(name, key, sha256=checksum(filename))
+            checksums[filename] = cached['sha256']
+        return checksums
+
+    def sftp(self, user, server):
+        """Get the SFTP channel to the given server, connecting if needed
+
+        :param user: user to log in as
+        :type user: str
+        :param server: server to connect to
+        :type server: str
+        :return: the SFTP channel, always the same one for the same server
+        :rtype: paramiko.SFTPClient
+        """
+        key = (user, server)
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        # connect outside of the main lock, so that servers connect in parallel
+        with lock:
+            connection = self._connections.get(key)
+            if connection is None:
+                connection = self._connect(user, server)
+                self._connections[key] = connection
+        return connection[1]
+
+    def upload(self, files, user, server, path, force=False, checksums=None):
+        """Upload the files that changed to a single server
+
+        :param files: local paths of the files to upload
+        :type files: list
+        :param user: user to log in as
+        :type user: str
+        :param server: server to upload the files to
+        :type server: str
+        :param path: remote folder where the files are stored
+        :type path: str
+        :param force: upload all files, even if they did not change
+        :type force: bool
+        :param checksums: checksum of each file, if already known
+        :type checksums: dict
+        :return: the server and path, whether the upload worked (and if not,
+          the error), which files were uploaded and how long it took
+        :rtype: dict
+        """
+        start = time.monotonic()
+        result = {'server': f'{user}@{server}:{path}', 'error': None, 'uploaded': []}
+        try:
+            if checksums is None:
+                checksums = self.checksums(files)
+            sftp = self.sftp(user, server)
+            manifest = _read_manifest(sftp, path)
+            for filename in files:
+                name = os.path.basename(filename)
+                if not force and manifest.get(name) == checksums[filename]:
+                    continue
+                sftp.put(filename, posixpath.join(path, name))
+                manifest[name] = checksums[filename]
+                result['uploaded'].append(name)
+            if result['uploaded']:
+                _write_manifest(sftp, path, manifest)
+        except Exception as error:  # noqa: B902
+            result['error'] = str(error) or error.__class__.__name__
+        result['duration'] = time.monotonic() - start
+        return result
+
+    def publish(self, files=CFG_FILES, force=False):
+        """Upload the files that changed to all servers at the same time
+
+        Failures on one server do not prevent the others from being uploaded.
+
+        :param files: local paths of the files to upload
+        :type files: list
+        :param force: upload all files, even if they did not change
+        :type force: bool
+        :return: one result per server, see upload
+        :rtype: list
+        """
+        if not self.servers:
+            return []
+        checksums = self.checksums(files)
+        if self.cache is not None:
+            self.cache.save()
+        with ThreadPoolExecutor(max_workers=len(self.servers)) as executor:
+            futures = [
+                executor.submit(self.upload, files, *server, force, checksums)
+                for server in self.servers
+            ]
+            results = [future.result() for future in futures]
+
+        for result in results:
+            if result['error'] is None:
+                logger.info(
+                    f'Pushed {len(result["uploaded"])} files '
+                    f'({len(files) - len(result["uploaded"])} unchanged) '
+                    f'to {result["server"]} in {result["duration"]:.2f}s'
+                )
+            else:
+                logger.error(f'Could not push to {result["server"]}: {result["error"]}')
+        return results
+
+    def close(self):
+        """Close all connections"""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+        for client, sftp in connections:
+            sftp.close()
+            client.close()
+
+
+def push_cfg_files(files=None, force=False):
+    """Upload the buildout .cfg files to all the servers on release.cfg
+
+    See freitag.releaser.publisher.Publisher.
+
+    :param files: which files to upload, defaults to
+      freitag.releaser.publisher.CFG_FILES
+    :type files: list
+    :param force: upload the files even if they did not change since they
+      were last uploaded
+    :type force: bool
+    :return: one result per server
+    :rtype: list
+    :raises: OSError if any of the servers could not be uploaded to
+    """
+    os.makedirs(cache_folder(), exist_ok=True)
+    cache = ReleaseIndex(os.path.join(cache_folder(), 'checksums.json'))
+    with Publisher(get_servers('eggs'), cache=cache) as publisher:
+        results = publisher.publish(files or CFG_FILES, force=force)
+
+    failed = [result['server'] for result in results if result['error']]
+    if failed:
+        raise OSError(f'Could not push cfg files to {", ".join(failed)}')
+    return results
@@ -1,22 +1,39 @@
-from freitag.releaser.utils import filter_git_history
-from freitag.releaser.utils import get_compact_git_history
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack
+from freitag.releaser.answers import Answers
+from freitag.releaser.common import cached_by_mtime
+from freitag.releaser.common import iter_concurrently
+from freitag.releaser.dependencies import release_waves
+from freitag.releaser.index import ReleaseIndex
+from freitag.releaser.news import highest_suffix
+from freitag.releaser.news import scan_news_folder
+from freitag.releaser.plan import PlanWriter
+from freitag.releaser.plan import shard_items
+from freitag.releaser.publisher import push_cfg_files
+from freitag.releaser.session import RepoSession
+from freitag.releaser.tracing import Tracer
+from freitag.releaser.utils import compile_commit_filter
+from freitag.releaser.utils import get_ignore_commit_messages
 from freitag.releaser.utils import get_latest_tag
+from freitag.releaser.utils import get_refs_fingerprint
+from freitag.releaser.utils import get_refs_snapshot
 from freitag.releaser.utils import git_repo
 from freitag.releaser.utils import is_branch_synced
-from freitag.releaser.utils import push_cfg_files
+from freitag.releaser.utils import iter_compact_git_history
+from freitag.releaser.utils import iter_filtered_git_history
+from freitag.releaser.utils import prefetch
 from freitag.releaser.utils import update_branch
-from freitag.releaser.utils import wrap_folder
-from freitag.releaser.utils import wrap_sys_argv
+from freitag.releaser.versions import set_versions
+from freitag.releaser.worker import ReleaseWorker
+from git import GitCommandError
 from git import InvalidGitRepositoryError
+from git import NoSuchPathError
 from git import Repo
 from plone.releaser.buildout import Buildout
-from zest.releaser import bumpversion
-from zest.releaser import fullrelease
 from zest.releaser.utils import ask
 
 import logging
 import os
-import re
 import sys
 import time
 
@@ -26,8 +43,6 @@ logger = logging.getLogger(__name__)
 DISTRIBUTION = '\033[1;91m{0}\033[0m'
 BRANCH = PATH = '\033[1;30m{0}\033[0m'
 
-NEWS_ENTRY_FILENAME_RE = re.compile(r'(\+?[\-\d\w]+).(\w+)(.\d)*')
-
 
 class FullRelease:
     """Releases all distributions that have changes and want to be released
@@ -49,12 +64,19 @@ class FullRelease:
     #: only release the distributions that their name match with this string
     filters = None
 
+    #: how many network operations (i.e. git fetch) can run concurrently
+    jobs = 8
+
     #: distributions that will be released
     distributions = []
 
-    #: plone.releaser.buildout.Buildout instance to get distribution's info
-    #: and save new versions
-    buildout = None
+    #: freitag.releaser.session.RepoSession that holds all git repositories
+    #: used during the run
+    session = None
+
+    #: freitag.releaser.index.ReleaseIndex that remembers which distributions
+    #: need a release across runs
+    index = None
 
     #: changelog for each released distribution
     changelogs = {}
@@ -65,6 +87,37 @@ class FullRelease:
     #: last tag for each released distribution (before the new release)
     last_tags = {}
 
+    #: compiled expression that matches the commits that are not worth
+    #: showing on the git history
+    commit_filter = None
+
+    #: distributions that have non-committed/unpushed changes
+    local_changes = None
+
+    #: kind of release (feature, breaking) of each distribution that is not
+    #: going to be a bugfix release
+    next_releases = None
+
+    #: where the mirrors of the repositories cloned during the release are
+    #: kept, if None they are cloned from scratch every time
+    mirrors_folder = None
+
+    #: freitag.releaser.tracing.Tracer that times each phase and each git or
+    #: network operation
+    tracer = None
+
+    #: freitag.releaser.plan.PlanWriter that reports each distribution in a
+    #: machine readable format, if any
+    plan = None
+
+    #: only this shard of the distributions is checked, as a (number, total)
+    #: tuple, see freitag.releaser.plan.shard_items
+    shard = None
+
+    #: freitag.releaser.answers.Answers given beforehand, if any, so that
+    #: no question is asked
+    answers = None
+
     #: global commit message for zope and deployment repositories which lists
     #: all distributions released and their changelog
     commit_message = ''
@@ -76,16 +129,35 @@ class FullRelease:
         filter_distributions='',
         offline=False,
         branch='main',
+        jobs=8,
+        index_file=None,
+        mirrors_folder=None,
+        tracer=None,
+        fresh=0,
+        output_format=None,
+        shard=None,
+        answers_file=None,
     ):
         self.path = path
         self.test = test
         self.offline = offline
         self.filters = filter_distributions
         self.branch = branch
-        self.buildout = Buildout(
-            sources_file='sources.cfg',
-            checkouts_file='buildout.cfg',
-        )
+        self.jobs = jobs
+        self.distributions = []
+        self.changelogs = {}
+        self.versions = {}
+        self.last_tags = {}
+        self.session = RepoSession(fresh=fresh)
+        self.index = ReleaseIndex(index_file)
+        self.mirrors_folder = mirrors_folder
+        self.tracer = tracer or Tracer(enabled=False)
+        self.commit_filter = compile_commit_filter(get_ignore_commit_messages())
+        self.local_changes = []
+        self.next_releases = {}
+        self.plan = PlanWriter(output_format) if output_format else None
+        self.shard = shard
+        self.answers = Answers(answers_file) if answers_file else None
 
         if self.offline and not self.test:
             logger.warning(
@@ -94,25 +166,78 @@ class FullRelease:
             )
             self.test = True
 
+        if self.plan is not None and not self.test:
+            logger.warning(
+                'A release plan is only an overview, no release can be done. '
+                'Test option has been turned on as well.'
+            )
+            self.test = True
+
+        if self.shard is not None and not self.test:
+            logger.warning(
+                'Only a shard of the distributions is checked, no release can '
+                'be done. Test option has been turned on as well.'
+            )
+            self.test = True
+
+    @property
+    def buildout(self):
+        """plone.releaser.buildout.Buildout instance to get distribution's info
+
+        It is only created when needed, and created again only if any of the
+        buildout files changed since.
+        """
+        return cached_by_mtime(Buildout, 'sources.cfg', 'buildout.cfg', 'versions.cfg')
+
     def __call__(self):
         """Go through all distributions and release them if needed *and* wanted"""
-        self.get_all_distributions()
+        try:
+            self._run()
+        finally:
+            self.session.close()
+
+    def _run(self):
+        span = self.tracer.span
+        with span('get_all_distributions', 'phase'):
+            self.get_all_distributions()
         self.filter_distros()
+        # each distribution goes through all checks on its own, so that it
+        # can be reviewed as soon as it is ready, rather than waiting for
+        # all the other distributions to be checked
+        distributions = self.distributions
         if not self.offline:
-            self.check_tooling()
-            self.check_parent_repo_changes()
-            self.check_pending_local_changes()
-        self.check_changes_to_be_released()
-        self.ask_what_to_release()
+            with span('check_tooling', 'phase'):
+                self.check_tooling()
+            with span('check_parent_repo_changes', 'phase'):
+                self.check_parent_repo_changes()
+            distributions = self.iter_pending_local_changes(distributions)
+        distributions = self.iter_changes_to_be_released(distributions)
+        # checks happen while reviewing, see the spans of each distribution
+        try:
+            with span('ask_what_to_release', 'phase'):
+                self.ask_what_to_release(distributions)
+        finally:
+            if self.plan is not None:
+                self.plan.close()
+
+        if not self.test:
+            self._confirm_local_changes()
+            with span('decide_versions', 'phase'):
+                self.decide_versions()
 
         if not self.test and len(self.distributions) > 0:
-            self.check_branches()
-            self.report_whats_to_release()
-            self.release_all()
-            self._create_commit_message()
-            self.update_buildout()
-            self.update_batou()
-            self.push_cfg_files()
+            phases = (
+                self.check_branches,
+                self.report_whats_to_release,
+                self.release_all,
+                self._create_commit_message,
+                self.update_buildout,
+                self.update_batou,
+                self.push_cfg_files,
+            )
+            for phase in phases:
+                with span(phase.__name__, 'phase'):
+                    phase()
 
     def get_all_distributions(self):
         """Get all distributions that are found in self.path"""
@@ -122,7 +247,7 @@ class FullRelease:
                 continue
 
             try:
-                Repo(path)
+                self.session.repo(path)
             except InvalidGitRepositoryError:
                 continue
 
@@ -131,15 +256,50 @@ class FullRelease:
         logger.debug('Distributions: ')
         logger.debug('\n'.join(self.distributions))
 
+    def prefetch(self):
+        """Fetch all distributions, and the parent repository, concurrently
+
+        So that later runs, with a freshness window, do not need to wait for
+        the network. A repository that can not be fetched (or that is not a
+        repository at all, e.g. the parent folder) does not prevent the others
+        from being fetched.
+
+        :return: the paths of the repositories that could not be fetched
+        :rtype: list
+        """
+        self.get_all_distributions()
+        self.filter_distros()
+
+        def fetch(path):
+            try:
+                self.session.fetch(self.session.repo(path), force=True)
+            except (
+                GitCommandError,
+                InvalidGitRepositoryError,
+                NoSuchPathError,
+            ) as error:
+                return error
+            return None
+
+        failed = []
+        paths = [os.path.curdir] + self.distributions
+        for path, error in iter_concurrently(fetch, paths, self.jobs):
+            if error is not None:
+                logger.warning(f'Could not fetch {path}: {error}')
+                failed.append(path)
+        logger.info(f'Fetched {len(paths) - len(failed)} repositories')
+        return sorted(failed)
+
     def filter_distros(self):
-        if not self.filters:
-            return
+        if self.filters:
+            tmp_list = []
+            for f in self.filters:
+                tmp_list += [d for d in self.distributions if d.find(f) != -1]
+            # keep them sorted
+            self.distributions = sorted(tmp_list)
 
-        tmp_list = []
-        for f in self.filters:
-            tmp_list += [d for d in self.distributions if d.find(f) != -1]
-        # keep them sorted
-        self.distributions = sorted(tmp_list)
+        if self.shard is not None:
+            self.distributions = shard_items(self.distributions, self.shard)
 
     def check_tooling(self):
         """Ensure that the tools needed are available
@@ -172,7 +332,7 @@ class FullRelease:
         logger.info(msg)
         logger.info('-' * len(msg))
 
-        repo = Repo(os.path.curdir)
+        repo = self.session.repo(os.path.curdir)
 
         dirty = False
         local_changes = False
@@ -180,7 +340,7 @@ class FullRelease:
         if repo.is_dirty():
             dirty = True
 
-        if not is_branch_synced(repo, branch=self.branch):
+        if not is_branch_synced(repo, branch=self.branch, session=self.session):
             local_changes = True
 
         if dirty or local_changes:
@@ -196,46 +356,88 @@ class FullRelease:
         msg = 'Check pending local changes'
         logger.info(msg)
         logger.info('-' * len(msg))
-        clean_distributions = []
-        for index, distribution_path in enumerate(self.distributions, start=1):
+        clean_distributions = list(self.iter_pending_local_changes(self.distributions))
+
+        # if nothing is about to be released, do not filter the distributions
+        if not self.test:
+            self._confirm_local_changes()
+            self.distributions = sorted(clean_distributions)
+
+        logger.debug('Distributions: ')
+        logger.debug('\n'.join(self.distributions))
+
+    def iter_pending_local_changes(self, distributions):
+        """Yield the distributions that do not have local changes
+
+        Distributions are fetched and checked concurrently, each one is
+        yielded, in order, as soon as its own checks and the ones of the
+        distributions before it are done.
+
+        The distributions that do have local changes are kept on
+        self.local_changes.
+
+        On test mode all distributions are yielded.
+        """
+        distributions = list(distributions)
+        checks = iter_concurrently(
+            self._has_local_changes, distributions, jobs=self.jobs
+        )
+        for index, (distribution_path, local_changes) in enumerate(checks, start=1):
             # nice to have: add some sort of progress bar like plone.releaser
             logger.info(
-                '[%i/%i] Checking %s',
+                '[%i/%i] Checked %s',
                 index,
-                len(self.distributions),
+                len(distributions),
                 distribution_path,
             )
-            repo = Repo(distribution_path)
 
-            dirty = False
-            local_changes = False
-
-            if repo.is_dirty():
-                dirty = True
-
-            if not is_branch_synced(repo, branch=self.branch):
-                local_changes = True
-
-            if dirty or local_changes:
+            if local_changes:
                 distro = DISTRIBUTION.format(distribution_path)
                 logger.info(
                     f'{distro} has non-committed/unpushed changes, '
                     'it will not be released.'
                 )
-                continue
+                self.local_changes.append(distribution_path)
+                # if nothing is about to be released, do not filter the
+                # distributions
+                if not self.test:
+                    continue
 
-            clean_distributions.append(distribution_path)
+            yield distribution_path
 
-        # if nothing is about to be released, do not filter the distributions
-        if not self.test:
-            if len(self.distributions) != len(clean_distributions):
-                if not ask('Do you want to continue?', default=True):
-                    sys.exit()
+    def _confirm_local_changes(self):
+        """Ask to continue if some distributions have local changes"""
+        if self.local_changes and not self._ask('Do you want to continue?'):
+            sys.exit()
 
-            self.distributions = clean_distributions
+    def _ask(self, question, default=True, distribution=None):
+        """Ask the user, unless the answer was given beforehand
 
-        logger.debug('Distributions: ')
-        logger.debug('\n'.join(self.distributions))
+        :param question: a yes/no question
+        :type question: str
+        :param default: answer if the user just presses enter
+        :type default: bool
+        :param distribution: name of the distribution the question is about,
+          if any
+        :type distribution: str
+        :rtype: bool
+        """
+        if self.answers is None:
+            return ask(question, default=default)
+        answer = self.answers.confirm(distribution)
+        logger.info(f'{question} {"yes" if answer else "no"} ({self.answers.path})')
+        return answer
+
+    def _has_local_changes(self, distribution_path):
+        """Fetch the distribution and check if it has local changes"""
+        repo = self.session.repo(distribution_path)
+        with self.tracer.span('fetch', 'network', distribution=distribution_path):
+            self.session.fetch(repo)
+        with self.tracer.span('local_changes', 'git', distribution=distribution_path):
+            if repo.is_dirty():
+                return True
+
+            return not is_branch_synced(repo, branch=self.branch, fetch=False)
 
     def check_changes_to_be_released(self):
         """Check which distributions have changes that could need a release"""
@@ -243,76 +445,105 @@ class FullRelease:
         msg = 'Check changes to be released'
         logger.info(msg)
         logger.info('-' * len(msg))
-        need_a_release = []
-        for distribution_path in self.distributions:
-            dist_name = distribution_path.split('/')[-1]
-            logger.debug(DISTRIBUTION.format(distribution_path))
-            repo = Repo(distribution_path)
-            remote = repo.remote()
-
-            latest_tag = get_latest_tag(repo, self.branch)
-            if latest_tag not in repo.tags:
-                # if there is no tag it definitely needs a release
-                need_a_release.append(distribution_path)
-                self.last_tags[dist_name] = latest_tag
-                continue
-
-            self.last_tags[dist_name] = latest_tag
-            # get the commit where the latest tag is on
-            tag = repo.tags[latest_tag]
-            tag_sha = tag.commit.hexsha
-
-            branch_sha = remote.refs[self.branch].commit.hexsha
-            if tag_sha != branch_sha:
-                # self.branch is ahead of the last tag: needs a release
-                need_a_release.append(distribution_path)
+        need_a_release = list(self.iter_changes_to_be_released(self.distributions))
 
         # if nothing is about to be released, do not filter the distributions
         if not self.test:
             self.distributions = need_a_release
 
-    def ask_what_to_release(self):
+    def iter_changes_to_be_released(self, distributions):
+        """Yield the distributions that have changes that could need a release
+
+        On test mode all distributions are yielded.
+        """
+        try:
+            for distribution_path in distributions:
+                dist_name = distribution_path.split('/')[-1]
+                logger.debug(DISTRIBUTION.format(distribution_path))
+                repo = self.session.repo(distribution_path)
+
+                key = get_refs_fingerprint(repo, self.branch)
+                status = self.index.get(distribution_path, key)
+                if status is None:
+                    status = self.index.set(
+                        distribution_path, key, **self._release_status(repo)
+                    )
+                else:
+                    logger.debug('Release status taken from the index')
+
+                self.last_tags[dist_name] = status['last_tag']
+                if status['needs_release'] or self.test:
+                    yield distribution_path
+        finally:
+            self.index.save()
+
+    def _release_status(self, repo):
+        """Find out if the given repository needs a release"""
+        with self.tracer.span(
+            'get_latest_tag', 'git', distribution=repo.working_tree_dir
+        ):
+            snapshot = get_refs_snapshot(repo)
+            latest_tag = get_latest_tag(repo, self.branch, snapshot=snapshot)
+        if latest_tag not in snapshot['tags']:
+            # if there is no tag it definitely needs a release
+            return {'last_tag': latest_tag, 'tag_sha': None, 'needs_release': True}
+
+        # get the commit where the latest tag is on
+        tag_sha = snapshot['tags'][latest_tag]
+        branch_sha = snapshot['remotes'][f'{repo.remote().name}/{self.branch}']
+        return {
+            'last_tag': latest_tag,
+            'tag_sha': tag_sha,
+            # self.branch is ahead of the last tag: needs a release
+            'needs_release': tag_sha != branch_sha,
+        }
+
+    def ask_what_to_release(self, distributions=None):
         """Show changes both in CHANGES.rst and on git history
 
         For that checkout the repository, show both changes to see if
         everything worth writing in CHANGES.rst from git history is already
         there.
+
+        :param distributions: distributions to review, they can come one
+          by one as they get ready, by default self.distributions
+        :type distributions: iterable
         """
+        if distributions is None:
+            distributions = self.distributions
+
         logger.info('')
         msg = 'What to release'
         logger.info(msg)
         logger.info('-' * len(msg))
         to_release = []
-        for distribution_path in self.distributions:
+        # while a question is waiting for an answer, the next distributions
+        # are already being prepared
+        reviews = prefetch(self._review_data, distributions, jobs=self.jobs)
+        for distribution_path, review in reviews:
             dist_name = distribution_path.split('/')[-1]
-            repo = Repo(distribution_path)
-
-            git_changes = get_compact_git_history(
-                repo,
-                self.last_tags[dist_name],
-                self.branch,
-            )
-            cleaned_git_changes = filter_git_history(git_changes)
+            if self.plan is not None:
+                self.plan.write(review['plan'])
+                continue
 
             # a git history without any meaningful commit should not be
             # released
-            if cleaned_git_changes == '':
+            if review['git_changes'] == '':
                 continue
 
             logger.info(DISTRIBUTION.format(distribution_path))
 
-            news_folder = f'{repo.working_tree_dir}/news'
-            try:
-                changes, next_release = self._grab_changelog(news_folder)
-            except OSError:
+            if review['changes'] is None:
                 logger.debug('Changelog not found, skipping.')
                 continue
+            changes = review['changes']
+            next_release = review['next_release']
             self.changelogs[dist_name] = changes
 
             # nice to have: show them side-by-side
             logger.info('git changelog')
             logger.info('')
-            logger.info(cleaned_git_changes)
+            logger.info(review['git_changes'])
             logger.info('')
             logger.info('')
             logger.info('news entries')
@@ -325,24 +556,124 @@ class FullRelease:
                     'You can still change the version number, see the next question.'
                 )
             msg = f'Is the change log for {dist_name} ready for release?'
-            if not self.test and ask(msg):
+            if not self.test and self._ask(msg, distribution=dist_name):
                 to_release.append(distribution_path)
+                bump = self.answers and self.answers.bump(dist_name)
+                if bump and bump != next_release:
+                    logger.info(f'It will be a {DISTRIBUTION.format(bump)} release')
+                    next_release = bump
 
                 if next_release != 'bugfix':
-                    self._decide_version(distribution_path, next_release)
+                    self.next_releases[distribution_path] = next_release
+
+        self.index.save()
 
         if not self.test:
-            self.distributions = to_release
+            # distributions are reviewed as they get ready, release them
+            # in a predictable order
+            self.distributions = sorted(to_release)
 
         logger.debug('Distributions: ')
         logger.debug('\n'.join(self.distributions))
 
-    @staticmethod
-    def _decide_version(distribution_path, next_release):
-        with wrap_folder(distribution_path):
-            with wrap_sys_argv():
-                sys.argv = ['bin/bumpversion', f'--{next_release}']
-                bumpversion.main()
+    def _review_data(self, distribution_path):
+        """Gather all the information needed to review a distribution"""
+        repo = self.session.repo(distribution_path)
+        review = {
+            'git_changes': self._cleaned_git_history(repo, distribution_path),
+            'changes': None,
+            'next_release': None,
+        }
+        if self.plan is not None:
+            review['plan'] = self._plan_record(repo, distribution_path, review)
+            return review
+        if review['git_changes'] == '':
+            return review
+
+        news_folder = f'{repo.working_tree_dir}/news'
+        try:
+            with self.tracer.span('news_entries', 'io', distribution=distribution_path):
+                review['changes'], review['next_release'] = self._grab_changelog(
+                    news_folder
+                )
+        except OSError:
+            pass
+        return review
+
+    def _plan_record(self, repo, distribution_path, review):
+        """Describe what releasing the given distribution would mean"""
+        key = get_refs_fingerprint(repo, self.branch)
+        status = self.index.get(distribution_path, key) or {}
+        last_tag = self.last_tags[distribution_path.split('/')[-1]]
+        # pending commits and history come from the very same commits, the
+        # review history starts one commit earlier to show the tagged one
+        try:
+            commits = repo.git.log(
+                '--oneline', f'{last_tag}..{key["branch_sha"]}'
+            ).splitlines()
+        except GitCommandError:
+            pending_commits = history = None
+        else:
+            pending_commits = len(commits)
+            history = list(iter_filtered_git_history(commits, self.commit_filter))
+
+        news = scan_news_folder(f'{repo.working_tree_dir}/news')
+        needs_release = status.get('needs_release', True)
+        return {
+            'path': distribution_path,
+            'last_tag': last_tag,
+            'branch_sha': key['branch_sha'],
+            'pending_commits': pending_commits,
+            'history': history,
+            'news': [news_filename for _, _, news_filename in news['entries']],
+            'invalid_news': [invalid['file'] for invalid in news['invalid']],
+            'next_release': news['next_release'],
+            # a history without any meaningful commit is not released
+            'needs_release': needs_release and review['git_changes'] != '',
+        }
+
+    def decide_versions(self):
+        """Bump the version of distributions that are not bugfix releases"""
+        for distribution_path in sorted(self.next_releases):
+            if distribution_path in self.distributions:
+                self._decide_version(
+                    distribution_path, self.next_releases[distribution_path]
+                )
+
+    def _cleaned_git_history(self, repo, distribution_path):
+        """Get the meaningful commits since the last tag, reusing the index"""
+        last_tag = self.last_tags[distribution_path.split('/')[-1]]
+        key = get_refs_fingerprint(repo, self.branch)
+        status = self.index.get(distribution_path, key)
+        commit_filter = self.commit_filter.pattern
+        indexed = status is not None and status['last_tag'] == last_tag
+        if indexed and status.get('history_filter') == commit_filter:
+            return status['history']
+
+        with self.tracer.span('git_history', 'git', distribution=distribution_path):
+            git_changes = iter_compact_git_history(repo, last_tag, self.branch)
+            cleaned_git_changes = '\n'.join(
+                iter_filtered_git_history(git_changes, self.commit_filter)
+            )
+        if indexed:
+            self.index.update(
+                distribution_path,
+                key,
+                history=cleaned_git_changes,
+                history_filter=commit_filter,
+            )
+        return cleaned_git_changes
+
+    def _decide_version(self, distribution_path, next_release):
+        worker = ReleaseWorker(distribution_path)
+        with self.tracer.span(
+            'bumpversion', 'zest.releaser', distribution=distribution_path
+        ):
+            options = [f'--{next_release}']
+            if self.answers is not None:
+                # the answers file is there to release unattended
+                options.append('--no-input')
+            worker.run('bumpversion', *options)
 
     def check_branches(self):
         """Check that all distributions to be released, and the parent
@@ -353,7 +684,7 @@ class FullRelease:
         logger.info(msg)
         logger.info('-' * len(msg))
 
-        parent_repo = Repo(os.path.curdir)
+        parent_repo = self.session.repo(os.path.curdir)
         current_branch = parent_repo.active_branch.name
 
         if current_branch != self.branch:
@@ -366,7 +697,7 @@ class FullRelease:
 
         for distribution_path in self.distributions:
             dist_name = distribution_path.split('/')[-1]
-            repo = Repo(distribution_path)
+            repo = self.session.repo(distribution_path)
             current_branch = repo.active_branch.name
 
             if current_branch != self.branch:
@@ -395,19 +726,67 @@ class FullRelease:
         logger.info('-' * len(msg))
         logger.info('Give yourself 5 seconds to decide if all is fine')
         time.sleep(5)
-        for distribution_path in self.distributions:
-            logger.info(f'\n\n{DISTRIBUTION.format(distribution_path)}')
-            dist_name = distribution_path.split('/')[-1]
-            repo = Repo(distribution_path)
 
-            release = ReleaseDistribution(repo.working_tree_dir, self.branch)
-            new_version = release()
-            self.versions[dist_name] = new_version
+        # distributions that do not depend on each other are released
+        # at the same time, each on its own process
+        waves = release_waves(self.distributions)
+        try:
+            self._release_waves(waves)
+        finally:
+            # pin the versions of the distributions that did get released,
+            # even if others failed
+            if self.versions:
+                set_versions(self.buildout.versions.path, self.versions)
+
+    def _release_waves(self, waves):
+        for number, wave in enumerate(waves, start=1):
+            logger.info(f'\nWave {number}/{len(waves)}: {", ".join(wave)}')
+            workers = max(min(self.jobs, len(wave)), 1)
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                futures = {
+                    distribution_path: pool.submit(
+                        self._release_distribution, distribution_path
+                    )
+                    for distribution_path in wave
+                }
+
+            errors = []
+            for distribution_path in wave:
+                logger.info(f'\n\n{DISTRIBUTION.format(distribution_path)}')
+                try:
+                    new_version = futures[distribution_path].result()
+                except Exception as error:  # noqa: B902
+                    # keep the versions of the distributions that did get
+                    # released, before stopping
+                    logger.error(f'Release failed: {error}')
+                    errors.append(error)
+                    continue
+                self._released(distribution_path, new_version)
 
-            self.buildout.set_version(dist_name, new_version)
+            if errors:
+                raise errors[0]
 
-            # update the local repository
-            update_branch(repo, self.branch)
+    def _release_distribution(self, distribution_path):
+        release = ReleaseDistribution(
+            self.session.repo(distribution_path).working_tree_dir,
+            self.branch,
+        )
+        with self.tracer.span(
+            'fullrelease', 'zest.releaser', distribution=distribution_path
+        ):
+            return release()
+
+    def _released(self, distribution_path, new_version):
+        """Keep track of a new release of the given distribution"""
+        dist_name = distribution_path.split('/')[-1]
+        self.versions[dist_name] = new_version
+
+        # update the local repository
+        repo = self.session.repo(distribution_path)
+        with self.tracer.span(
+            'update_branch', 'network', distribution=distribution_path
+        ):
+            update_branch(repo, self.branch, session=self.session)
 
     def _create_commit_message(self):
         msg = ['New releases:', '']
@@ -429,11 +808,12 @@ class FullRelease:
         logger.info(msg)
         logger.info('-' * len(msg))
 
-        repo = Repo(os.path.curdir)
+        repo = self.session.repo(os.path.curdir)
         repo.git.add('versions.cfg')
         repo.git.commit(message=self.commit_message)
         # push the changes
-        repo.remote().push()
+        with self.tracer.span('push', 'network'):
+            repo.remote().push()
 
     def push_cfg_files(self):
         """Push cfg files so that jenkins gets them already"""
@@ -456,24 +836,26 @@ class FullRelease:
                 'Batou can not be updated!'
             )
             return
-        # clone the repo
-        with git_repo(deployment_repo, shallow=False) as repo:
-            # get components/plone/versions/versions.cfg Buildout
-            path = 'components/plone/versions/versions.cfg'
-            plone_versions = f'{repo.working_tree_dir}/{path}'
-            deployment_buildout = Buildout(
-                sources_file=plone_versions,
-                checkouts_file=plone_versions,
-                versions_file=plone_versions,
-            )
+        # clone the repo, only versions.cfg is needed
+        path = 'components/plone/versions/versions.cfg'
+        with ExitStack() as stack:
+            with self.tracer.span('clone', 'network', url=deployment_repo.url):
+                repo = stack.enter_context(
+                    git_repo(
+                        deployment_repo,
+                        mirrors_folder=self.mirrors_folder,
+                        sparse_paths=[path],
+                    )
+                )
             # update version pins
-            for dist_name in self.versions:
-                deployment_buildout.set_version(dist_name, self.versions[dist_name])
-            # commit and push the repo
-            repo.index.add([path])
+            set_versions(f'{repo.working_tree_dir}/{path}', self.versions)
+            # commit and push the repo, the file is staged with git itself as
+            # it knows how to deal with sparse checkouts
+            repo.git.add(path)
             repo.index.commit(message=self.commit_message)
             # push the changes
-            repo.remote().push()
+            with self.tracer.span('push', 'network', url=deployment_repo.url):
+                repo.remote().push()
 
     def _grab_changelog(self, news_folder):
         entries, next_release = self.verify_newsentries(news_folder)
@@ -489,39 +871,21 @@ class FullRelease:
         return lines, next_release
 
     def verify_newsentries(self, news_folder):
-        valid_entries = []
-        valid_suffixes = ('bugfix', 'feature', 'breaking', 'internal')
-        highest_suffix_used = 'bugfix'
-        try:
-            for news_filename in os.listdir(news_folder):
-                if news_filename in ('.gitkeep', '.changelog_template.jinja'):
-                    continue
-                news_path = os.sep.join([news_folder, news_filename])
-                matches = NEWS_ENTRY_FILENAME_RE.match(news_filename)
-                if matches:
-                    issue, suffix, _ = matches.groups()
-                    if suffix not in valid_suffixes:
-                        raise ValueError(
-                            f'{matches.groups(1)} on "{news_path}" is not valid. '
-                            f'Valid suffixes are: {valid_suffixes}'
-                        )
-                    valid_entries.append([suffix, issue, news_filename])
-                    highest_suffix_used = self.highest_suffix(
-                        highest_suffix_used, suffix
-                    )
-                    logger.debug(f'Found a valid news entry: {news_path}')
-                else:
-                    logger.debug(f'!!! Invalid news entry: {news_path}')
-        except OSError:
+        result = scan_news_folder(news_folder)
+        if not result['exists']:
             logger.warning(f'{news_folder} does not exist')
-        return valid_entries, highest_suffix_used
+        for news_filename in result['ignored']:
+            logger.debug(f'!!! Invalid news entry: {news_folder}/{news_filename}')
+        if result['invalid']:
+            # a news entry with an unknown suffix
+            invalid = result['invalid'][0]
+            news_path = os.sep.join([news_folder, invalid['file']])
+            raise ValueError(f'"{news_path}": {invalid["reason"]}')
+        for _, _, news_filename in result['entries']:
+            logger.debug(f'Found a valid news entry: {news_folder}/{news_filename}')
+        return result['entries'], result['next_release']
 
-    @staticmethod
-    def highest_suffix(current, new):
-        suffixes_ordered = ('breaking', 'feature', 'bugfix')
-        for suffix in suffixes_ordered:
-            if current == suffix or new == suffix:
-                return suffix
+    highest_suffix = staticmethod(highest_suffix)
 
 
 class ReleaseDistribution:
@@ -540,16 +904,20 @@ class ReleaseDistribution:
     #: parent repository which will be updated with the new release
     parent_repo = None
 
-    def __init__(self, path, branch='main'):
+    #: freitag.releaser.session.RepoSession to reuse git repositories from
+    session = None
+
+    def __init__(self, path, branch='main', session=None):
         self.path = path
         self.branch = branch
         self.name = path.split('/')[-1]
+        self.session = session
 
     def __call__(self):
         self._check_distribution_exists()
-        self._zest_releaser()
+        result = self._zest_releaser()
 
-        return self.get_version()
+        return result.get('version') or self.get_version()
 
     def _check_distribution_exists(self):
         """Check that the folder exists"""
@@ -557,15 +925,19 @@ class ReleaseDistribution:
             raise OSError(f'Path {PATH.format(self.path)} does NOT exist')
 
     def _zest_releaser(self):
-        """Release the distribution"""
-        # remove arguments so zest.releaser is not confused
-        # will most probably *not* be fixed by zest.releaser itself:
-        # https://github.com/zestsoftware/zest.releaser/issues/146
-        with wrap_folder(self.path):
-            with wrap_sys_argv():
-                sys.argv = ['bin/fullrelease', '--no-input']
-                fullrelease.main()
+        """Release the distribution
+
+        It runs on its own process, see freitag.releaser.worker, so that
+        neither the current working directory nor sys.argv are changed.
+
+        :return: what the release reports back, i.e. the new version
+        :rtype: dict
+        """
+        return ReleaseWorker(self.path, self.name).run('fullrelease', '--no-input')
 
     def get_version(self):
-        self.repo = Repo(self.path)
+        if self.session is None:
+            self.repo = Repo(self.path)
+        else:
+            self.repo = self.session.repo(self.path)
         return self.repo.git.describe('--tags').split('-')[0]
@@ -0,0 +1,115 @@
+from git import Repo
+
+import logging
+import os
+import threading
+import time
+
+
+logger = logging.getLogger(__name__)
+
+
+class RepoSession:
+    """Registry of git repositories used during a single run
+
+    Every path gets a single git.Repo instance, no matter how many times
+    it is requested, and its default remote is fetched at most once.
+
+    GitPython keeps persistent git cat-file processes per git.Repo instance,
+    closing the session terminates all of them.
+
+    :param fresh: repositories that were fetched (by any process, e.g.
+      freitag_manage prefetch) less than these many seconds ago are not
+      fetched again, 0 to always fetch them once per session
+    :type fresh: int
+    """
+
+    def __init__(self, fresh=0):
+        self.fresh = fresh
+        #: git.Repo instances, keyed by their absolute path
+        self._repos = {}
+        #: timestamp of the last fetch, keyed by the repository absolute path
+        self._fetched = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @staticmethod
+    def _key(path):
+        return os.path.realpath(path)
+
+    def repo(self, path):
+        """Get the repository found on the given path
+
+        :param path: path to the git repository
+        :type path: str
+        :return: always the same repository for the same path
+        :rtype: git.Repo
+        :raises: git.exc.InvalidGitRepositoryError if path is not a git
+          repository
+        """
+        key = self._key(path)
+        with self._lock:
+            repo = self._repos.get(key)
+            if repo is None:
+                repo = Repo(path)
+                self._repos[key] = repo
+        return repo
+
+    def fetch(self, repo, force=False):
+        """Fetch the default remote of the given repository
+
+        :param repo: the repository to fetch
+        :type repo: git.Repo
+        :param force: fetch even if it was already fetched on this session
+        :type force: bool
+        :return: whether a fetch actually happened
+        :rtype: bool
+        """
+        key = self._key(repo.working_dir)
+        if not force and key in self._fetched:
+            logger.debug(f'{repo.working_dir} already fetched, skipping')
+            return False
+
+        fetched = self._fetch_head_time(repo)
+        if not force and fetched is not None and time.time() - fetched < self.fresh:
+            logger.debug(f'{repo.working_dir} fetched recently, skipping')
+            with self._lock:
+                self._fetched[key] = fetched
+            return False
+
+        repo.remote().fetch()
+        with self._lock:
+            self._fetched[key] = time.time()
+        return True
+
+    def _fetch_head_time(self, repo):
+        """When was the repository last fetched, according to git itself"""
+        if not self.fresh:
+            return None
+        try:
+            return os.stat(os.path.join(repo.git_dir, 'FETCH_HEAD')).st_mtime
+        except OSError:
+            return None
+
+    def last_fetched(self, repo):
+        """Timestamp of the last fetch of the given repository on this session
+
+        :param repo: the repository
+        :type repo: git.Repo
+        :return: seconds since the epoch, or None if it was not fetched
+        :rtype: float
+        """
+        return self._fetched.get(self._key(repo.working_dir))
+
+    def close(self):
+        """Release all the resources held by the repositories"""
+        with self._lock:
+            for repo in self._repos.values():
+                repo.close()
+            self._repos.clear()
+            self._fetched.clear()
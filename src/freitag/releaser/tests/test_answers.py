@@ -0,0 +1,63 @@
+from freitag.releaser.answers import Answers
+from tempfile import mkdtemp
+
+import json
+import os
+import shutil
+import unittest
+
+
+class TestAnswers(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, filename, contents):
+        path = os.path.join(self.folder, filename)
+        with open(path, 'w') as answers_file:
+            answers_file.write(contents)
+        return path
+
+    def test_json(self):
+        """Check that answers are read from JSON files"""
+        data = {
+            'continue': True,
+            'distributions': {
+                'my.distribution': {'release': True, 'bump': 'breaking'},
+                'other_distribution': False,
+            },
+        }
+        answers = Answers(self._write('answers.json', json.dumps(data)))
+
+        self.assertTrue(answers.confirm())
+        self.assertTrue(answers.confirm('my.distribution'))
+        self.assertEqual(answers.bump('my.distribution'), 'breaking')
+        # names are matched as pip does
+        self.assertFalse(answers.confirm('Other.Distribution'))
+        self.assertIsNone(answers.bump('other.distribution'))
+
+    def test_cfg(self):
+        """Check that answers are read from .cfg files"""
+        answers = Answers(
+            self._write(
+                'answers.cfg',
+                '[my.distribution]\nrelease = yes\nbump = feature\n',
+            )
+        )
+
+        self.assertFalse(answers.confirm())
+        self.assertTrue(answers.confirm('my.distribution'))
+        self.assertEqual(answers.bump('my.distribution'), 'feature')
+
+    def test_not_listed(self):
+        """Check that distributions not listed are not released"""
+        answers = Answers(self._write('answers.json', '{}'))
+        self.assertFalse(answers.confirm('my.distribution'))
+
+    def test_invalid_bump(self):
+        """Check that only known version bumps are accepted"""
+        path = self._write('answers.cfg', '[my.distribution]\nbump = major\n')
+        with self.assertRaises(ValueError):
+            Answers(path)
@@ -0,0 +1,83 @@
+from freitag.releaser.common import cached_by_mtime
+from freitag.releaser.common import get_servers
+from freitag.releaser.common import read_config
+from freitag.releaser.release import FullRelease
+from freitag.releaser.utils import wrap_folder
+from tempfile import mkdtemp
+from unittest import mock
+
+import os
+import shutil
+import unittest
+
+
+class TestCommon(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.config_file = os.path.join(self.folder, 'release.cfg')
+        self._write('[eggs]\nservers =\n    user@one.example.com:/srv\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _write(self, contents, mtime=None):
+        with open(self.config_file, 'w') as config_file:
+            config_file.write(contents)
+        if mtime is not None:
+            os.utime(self.config_file, ns=(mtime, mtime))
+
+    def test_cached_by_mtime(self):
+        """Check that the factory is only called if the file changed"""
+        factory = mock.Mock(side_effect=lambda path: object())
+        first = cached_by_mtime(factory, self.config_file)
+        self.assertIs(cached_by_mtime(factory, self.config_file), first)
+        factory.assert_called_once_with(self.config_file)
+
+        self._write('[eggs]\n', mtime=1_000_000_000)
+        self.assertIsNot(cached_by_mtime(factory, self.config_file), first)
+        self.assertEqual(factory.call_count, 2)
+
+    def test_cached_by_mtime_missing_file(self):
+        """Check that a file that appears is read"""
+        path = os.path.join(self.folder, 'sources.cfg')
+        factory = mock.Mock(side_effect=lambda path: os.path.exists(path))
+        self.assertFalse(cached_by_mtime(factory, path))
+        open(path, 'w').close()
+        self.assertTrue(cached_by_mtime(factory, path))
+
+    def test_read_config_missing(self):
+        """Check that reading a missing configuration file fails"""
+        with self.assertRaises(OSError):
+            read_config(os.path.join(self.folder, 'missing.cfg'))
+
+    def test_get_servers(self):
+        """Check that release.cfg is parsed only once"""
+        with wrap_folder(self.folder):
+            servers = get_servers('eggs')
+            with mock.patch('configparser.ConfigParser.read_file') as read_file:
+                self.assertEqual(get_servers('eggs'), servers)
+            read_file.assert_not_called()
+
+        self.assertEqual(servers, [('user', 'one.example.com', '/srv')])
+
+    def test_get_servers_updated(self):
+        """Check that changes on release.cfg are picked up"""
+        with wrap_folder(self.folder):
+            get_servers('eggs')
+            self._write(
+                '[eggs]\nservers =\n    user@two.example.com:/srv\n',
+                mtime=1_000_000_000,
+            )
+            servers = get_servers('eggs')
+
+        self.assertEqual(servers, [('user', 'two.example.com', '/srv')])
+
+    def test_buildout_is_lazy(self):
+        """Check that the buildout files are only read when needed"""
+        with wrap_folder(self.folder):
+            with mock.patch('freitag.releaser.release.Buildout') as buildout:
+                full_release = FullRelease()
+                buildout.assert_not_called()
+                self.assertIs(full_release.buildout, full_release.buildout)
+
+        buildout.assert_called_once()
@@ -0,0 +1,101 @@
+from freitag.releaser.dependencies import get_requirements
+from freitag.releaser.dependencies import release_waves
+from tempfile import mkdtemp
+
+import os
+import shutil
+import unittest
+
+
+PYPROJECT = """
+[project]
+name = "{0}"
+dependencies = [{1}]
+"""
+
+SETUP_CFG = """
+[metadata]
+name = {0}
+
+[options]
+install_requires =
+{1}
+"""
+
+
+class TestDependencies(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _distribution(self, folder, name, requirements, kind='pyproject'):
+        path = os.path.join(self.folder, folder)
+        os.makedirs(path)
+        if kind == 'pyproject':
+            quoted = ', '.join(f"'{requirement}'" for requirement in requirements)
+            with open(os.path.join(path, 'pyproject.toml'), 'w') as a_file:
+                a_file.write(PYPROJECT.format(name, quoted))
+        elif kind == 'setup.cfg':
+            lines = '\n'.join(f'    {requirement}' for requirement in requirements)
+            with open(os.path.join(path, 'setup.cfg'), 'w') as a_file:
+                a_file.write(SETUP_CFG.format(name, lines))
+        else:
+            egg_info = os.path.join(path, 'src', f'{name}.egg-info')
+            os.makedirs(egg_info)
+            with open(os.path.join(egg_info, 'requires.txt'), 'w') as a_file:
+                a_file.write('\n'.join(requirements))
+                a_file.write('\n\n[test]\nfreitag.testing\n')
+        return path
+
+    def test_get_requirements_pyproject(self):
+        """Check that pyproject.toml metadata is read"""
+        path = self._distribution(
+            'one', 'Freitag_One', ['freitag.two>=1.0', 'plone.api; python_version>"3"']
+        )
+        self.assertEqual(
+            get_requirements(path), ('freitag-one', {'freitag-two', 'plone-api'})
+        )
+
+    def test_get_requirements_setup_cfg(self):
+        """Check that setup.cfg metadata is read"""
+        path = self._distribution('one', 'freitag.one', ['freitag.two'], 'setup.cfg')
+        self.assertEqual(get_requirements(path), ('freitag-one', {'freitag-two'}))
+
+    def test_get_requirements_egg_info(self):
+        """Check that the egg-info metadata is read, ignoring extras"""
+        path = self._distribution('one', 'freitag.one', ['freitag.two'], 'egg-info')
+        self.assertEqual(get_requirements(path), ('freitag-one', {'freitag-two'}))
+
+    def test_get_requirements_nothing(self):
+        """Check that the folder name is used if nothing is found"""
+        path = os.path.join(self.folder, 'freitag.one')
+        os.makedirs(path)
+        self.assertEqual(get_requirements(path), ('freitag-one', set()))
+
+    def test_release_waves(self):
+        """Check that distributions are released after their dependencies"""
+        base = self._distribution('base', 'freitag.base', ['plone.api'])
+        one = self._distribution('one', 'freitag.one', ['freitag.base'], 'setup.cfg')
+        two = self._distribution('two', 'freitag.two', ['freitag.base'])
+        top = self._distribution('top', 'freitag.top', ['freitag.one', 'freitag.two'])
+        alone = self._distribution('alone', 'freitag.alone', [])
+
+        self.assertEqual(
+            release_waves([top, two, one, base, alone]),
+            [[alone, base], [one, two], [top]],
+        )
+
+    def test_release_waves_only_given_distributions(self):
+        """Check that dependencies not being released are ignored"""
+        self._distribution('base', 'freitag.base', [])
+        one = self._distribution('one', 'freitag.one', ['freitag.base'])
+        self.assertEqual(release_waves([one]), [[one]])
+
+    def test_release_waves_circular(self):
+        """Check that circular dependencies are reported"""
+        one = self._distribution('one', 'freitag.one', ['freitag.two'])
+        two = self._distribution('two', 'freitag.two', ['freitag.one'])
+        with self.assertRaises(ValueError):
+            release_waves([one, two])
@@ -0,0 +1,49 @@
+from freitag.releaser.index import ReleaseIndex
+from tempfile import mkdtemp
+
+import os
+import shutil
+import unittest
+
+
+class TestReleaseIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.path = os.path.join(self.folder, 'index.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def test_entries_are_persisted(self):
+        """Check that entries survive across instances"""
+        index = ReleaseIndex(self.path)
+        index.set('src/one', {'sha': 'abc'}, needs_release=True)
+        index.update('src/one', {'sha': 'abc'}, history='some commit')
+        index.save()
+
+        index = ReleaseIndex(self.path)
+        self.assertEqual(
+            index.get('src/one', {'sha': 'abc'}),
+            {'needs_release': True, 'history': 'some commit'},
+        )
+
+    def test_outdated_entry(self):
+        """Check that an entry with a different key is not returned"""
+        index = ReleaseIndex()
+        index.set('src/one', {'sha': 'abc'}, needs_release=True)
+        self.assertIsNone(index.get('src/one', {'sha': 'def'}))
+        self.assertIsNone(index.get('src/two', {'sha': 'abc'}))
+
+    def test_in_memory(self):
+        """Check that without a path nothing is written"""
+        index = ReleaseIndex()
+        index.set('src/one', {'sha': 'abc'}, needs_release=True)
+        index.save()
+        self.assertEqual(os.listdir(self.folder), [])
+
+    def test_broken_index(self):
+        """Check that an unreadable index is discarded"""
+        with open(self.path, 'w') as index_file:
+            index_file.write('{not json')
+        index = ReleaseIndex(self.path)
+        self.assertIsNone(index.get('src/one', {}))
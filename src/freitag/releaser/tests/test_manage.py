@@ -0,0 +1,96 @@
+from argh import ArghParser
+from freitag.releaser.manage import full_release
+from tempfile import mkdtemp
+
+import os
+import shutil
+import subprocess
+import sys
+import unittest
+
+
+#: modules that only the release itself needs
+HEAVY_MODULES = ('git', 'zest.releaser', 'plone.releaser', 'bumpversion')
+
+#: how long importing freitag.releaser.manage can take, in microseconds,
+#: it takes ~50ms, most of it importing argh, while git, zest.releaser or
+#: paramiko alone take longer than that
+IMPORT_TIME_BUDGET = 80_000
+
+
+def _imports(code):
+    """Run the given code on a new interpreter and report what it imported
+
+    :return: the cumulative import time, in microseconds, of each module
+    :rtype: dict
+    """
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        modules[name.strip()] = int(cumulative)
+    return modules
+
+
+class TestManage(unittest.TestCase):
+    def assertNotImported(self, modules, heavy_modules=HEAVY_MODULES):
+        imported = [
+            name
+            for name in modules
+            for heavy in heavy_modules
+            if name == heavy or name.startswith(f'{heavy}.')
+        ]
+        self.assertEqual(imported, [])
+
+    def test_import(self):
+        """Check that the command line does not import the release machinery"""
+        modules = _imports('import freitag.releaser.manage')
+        self.assertNotImported(modules, HEAVY_MODULES + ('paramiko',))
+        self.assertLess(modules['freitag.releaser.manage'], IMPORT_TIME_BUDGET)
+
+    def test_news_command(self):
+        """Check that the news command does not import the release machinery"""
+        folder = mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        os.makedirs(os.path.join(folder, 'src', 'one', '.git'))
+        modules = _imports(
+            'from freitag.releaser.manage import check_newsentries\n'
+            f'check_newsentries(path={folder!r}, cache_file="")'
+        )
+        self.assertNotImported(modules, HEAVY_MODULES + ('paramiko',))
+
+    def test_push_command(self):
+        """Check that the push command does not import git nor zest.releaser"""
+        modules = _imports('import freitag.releaser.publisher')
+        self.assertNotImported(modules)
+
+
+class TestCommandLine(unittest.TestCase):
+    def _parse(self, *argv):
+        parser = ArghParser()
+        parser.add_commands([full_release])
+        return parser.parse_args(['r', *argv])
+
+    def test_test_short_flag(self):
+        """Check that -t still turns the test mode on"""
+        self.assertTrue(self._parse('-t').test)
+        self.assertFalse(self._parse().test)
+
+    def test_offline_short_flag(self):
+        """Check that -o still turns the offline mode on"""
+        self.assertTrue(self._parse('-o').offline)
+        self.assertFalse(self._parse().offline)
+
+    def test_short_flags_together(self):
+        """Check that both short flags can be given along with --format"""
+        options = self._parse('-t', '-o', '--format', 'json')
+        self.assertTrue(options.test)
+        self.assertTrue(options.offline)
+        self.assertEqual(options.output_format, 'json')
@@ -0,0 +1,118 @@
+from freitag.releaser.index import ReleaseIndex
+from freitag.releaser.manage import check_newsentries
+from freitag.releaser.news import check_news_folders
+from freitag.releaser.news import find_distributions
+from freitag.releaser.news import scan_news_folder
+from freitag.releaser.release import FullRelease
+from freitag.releaser.utils import wrap_folder
+from tempfile import mkdtemp
+from testfixtures import LogCapture
+from testfixtures import OutputCapture
+from unittest import mock
+
+import json
+import os
+import shutil
+import unittest
+
+
+class TestNews(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.src = os.path.join(self.folder, 'src')
+        for name in ('one', 'two'):
+            os.makedirs(os.path.join(self.src, name, '.git'))
+            os.makedirs(os.path.join(self.src, name, 'news'))
+        os.makedirs(os.path.join(self.src, 'not.a.repo'))
+        self._touch('one', '.gitkeep')
+        self._touch('one', '23.bugfix')
+        self._touch('one', '+lala.feature')
+        self._touch('two', '42.feature.1')
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _touch(self, distribution, filename):
+        open(os.path.join(self.src, distribution, 'news', filename), 'w').close()
+
+    def test_find_distributions(self):
+        """Check that only git repositories are found"""
+        self.assertEqual(
+            find_distributions(self.src),
+            [f'{self.src}/one', f'{self.src}/two'],
+        )
+
+    def test_scan_news_folder(self):
+        """Check that valid news entries are found"""
+        result = scan_news_folder(f'{self.src}/one/news')
+        self.assertEqual(
+            result['entries'],
+            [['feature', '+lala', '+lala.feature'], ['bugfix', '23', '23.bugfix']],
+        )
+        self.assertEqual(result['invalid'], [])
+        self.assertEqual(result['next_release'], 'feature')
+
+    def test_scan_news_folder_invalid(self):
+        """Check that news entries with unknown suffixes are reported"""
+        self._touch('one', '12.fix')
+        result = scan_news_folder(f'{self.src}/one/news')
+        self.assertEqual(len(result['entries']), 2)
+        self.assertEqual(result['invalid'][0]['file'], '12.fix')
+
+    def test_scan_news_folder_dotfiles(self):
+        """Check that files that are not news entries are ignored"""
+        self._touch('one', '.DS_Store')
+        self._touch('one', '.gitignore')
+        result = scan_news_folder(f'{self.src}/one/news')
+        self.assertEqual(len(result['entries']), 2)
+        self.assertEqual(result['invalid'], [])
+        self.assertEqual(result['ignored'], ['.DS_Store', '.gitignore'])
+
+    def test_command_dotfiles(self):
+        """Check that the command agrees with the release on dotfiles"""
+        self._touch('two', '.DS_Store')
+        with wrap_folder(self.folder), LogCapture():
+            check_newsentries(cache_file='')
+            entries, _ = FullRelease().verify_newsentries('src/two/news')
+        self.assertEqual(entries, [['feature', '42', '42.feature.1']])
+
+    def test_scan_news_folder_missing(self):
+        """Check that a missing news folder is reported"""
+        result = scan_news_folder(f'{self.src}/not.a.repo/news')
+        self.assertFalse(result['exists'])
+        self.assertEqual(result['entries'], [])
+
+    def test_check_news_folders_cache(self):
+        """Check that unchanged folders are not scanned again"""
+        folders = [f'{self.src}/one/news', f'{self.src}/two/news']
+        cache_file = os.path.join(self.folder, 'cache.json')
+        first = check_news_folders(folders, cache=ReleaseIndex(cache_file))
+
+        with mock.patch('freitag.releaser.news.scan_news_folder') as scan:
+            second = check_news_folders(folders, cache=ReleaseIndex(cache_file))
+        self.assertEqual(scan.call_count, 0)
+        self.assertEqual(first, second)
+
+        # adding a file changes the folder, it is scanned again
+        self._touch('two', '7.breaking')
+        third = check_news_folders(folders, cache=ReleaseIndex(cache_file))
+        self.assertEqual(third[1]['next_release'], 'breaking')
+
+    def test_command(self):
+        """Check that the command fails and reports invalid entries"""
+        self._touch('two', '12.fix')
+        with wrap_folder(self.folder), LogCapture() as logs:
+            with OutputCapture(separate=True) as output:
+                with self.assertRaises(SystemExit) as context:
+                    check_newsentries(cache_file='', json_output=True)
+
+        self.assertEqual(context.exception.code, 1)
+        summary = json.loads(output.stdout.getvalue())
+        self.assertEqual(summary['checked'], 2)
+        self.assertEqual(list(summary['invalid']), ['src/two/news'])
+        self.assertIn('src/two/news/12.fix', str(logs))
+
+    def test_command_valid(self):
+        """Check that the command does not fail if all entries are valid"""
+        with wrap_folder(self.folder), LogCapture():
+            check_newsentries(cache_file='')
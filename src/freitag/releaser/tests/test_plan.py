@@ -0,0 +1,94 @@
+from freitag.releaser.plan import merge_plans
+from freitag.releaser.plan import parse_shard
+from freitag.releaser.plan import PlanWriter
+from freitag.releaser.plan import shard_items
+from tempfile import mkdtemp
+
+import io
+import json
+import os
+import shutil
+import unittest
+
+
+class TestPlanWriter(unittest.TestCase):
+    def test_ndjson(self):
+        """Check that each record is written as soon as it is given"""
+        stream = io.StringIO()
+        writer = PlanWriter('ndjson', stream=stream)
+        writer.write({'path': 'src/b'})
+        self.assertEqual(stream.getvalue(), '{"path": "src/b"}\n')
+
+        writer.write({'path': 'src/a'})
+        writer.close()
+        self.assertEqual(len(stream.getvalue().splitlines()), 2)
+
+    def test_json(self):
+        """Check that all records are written, sorted, on close"""
+        stream = io.StringIO()
+        writer = PlanWriter('json', stream=stream)
+        writer.write({'path': 'src/b'})
+        writer.write({'path': 'src/a'})
+        self.assertEqual(stream.getvalue(), '')
+
+        writer.close()
+        self.assertEqual(
+            json.loads(stream.getvalue()), [{'path': 'src/a'}, {'path': 'src/b'}]
+        )
+
+    def test_unknown_format(self):
+        """Check that only known formats are accepted"""
+        with self.assertRaises(ValueError):
+            PlanWriter('yaml')
+
+
+class TestShards(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _plan(self, name, paths, output_format):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as plan_file:
+            writer = PlanWriter(output_format, stream=plan_file)
+            for record_path in paths:
+                writer.write({'path': record_path})
+            writer.close()
+        return path
+
+    def test_parse_shard(self):
+        """Check that shards are given as I/N"""
+        self.assertEqual(parse_shard('2/4'), (2, 4))
+        for shard in ('0/4', '5/4', '2', 'a/b'):
+            with self.assertRaises(ValueError):
+                parse_shard(shard)
+
+    def test_shard_items(self):
+        """Check that all shards together get every item only once"""
+        items = [f'src/{number}' for number in range(10)]
+        shards = [shard_items(reversed(items), (number, 3)) for number in (1, 2, 3)]
+        self.assertEqual([len(shard) for shard in shards], [4, 3, 3])
+        self.assertEqual(sorted(sum(shards, [])), items)
+
+    def test_merge_plans(self):
+        """Check that plans of any format are merged, sorted"""
+        plans = [
+            self._plan('one.json', ['src/c', 'src/a'], 'json'),
+            self._plan('two.ndjson', ['src/b'], 'ndjson'),
+            self._plan('three.ndjson', [], 'ndjson'),
+        ]
+        self.assertEqual(
+            merge_plans(plans),
+            [{'path': 'src/a'}, {'path': 'src/b'}, {'path': 'src/c'}],
+        )
+
+    def test_merge_plans_overlapping(self):
+        """Check that a distribution can not be on two plans"""
+        plans = [
+            self._plan('one.json', ['src/a'], 'json'),
+            self._plan('two.json', ['src/a'], 'json'),
+        ]
+        with self.assertRaises(ValueError):
+            merge_plans(plans)
@@ -0,0 +1,148 @@
+from freitag.releaser.prerelease import _timeout
+from freitag.releaser.prerelease import changed_templates
+from freitag.releaser.prerelease import check_translations
+from git import Repo
+from tempfile import mkdtemp
+from testfixtures import LogCapture
+from unittest import mock
+
+import os
+import shutil
+import stat
+import sys
+import unittest
+
+
+# reports, like find-untranslated -n does, every template containing
+# "untranslated", and where it was called with, on calls.log
+I18NDUDE = f"""#!{sys.executable}
+import sys, time
+with open('calls.log', 'a') as log:
+    log.write(' '.join(sys.argv[2:]) + '\\n')
+for path in sys.argv[3:]:
+    with open(path) as template:
+        contents = template.read()
+    if 'slow' in contents:
+        time.sleep(10)
+    if 'untranslated' in contents:
+        print(f'{{path}}:1:0:\\n-ERROR- - untranslated string')
+"""
+
+
+class TestCheckTranslations(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.repo = Repo.init(self.folder)
+        os.makedirs(os.path.join(self.folder, 'bin'))
+        i18ndude = os.path.join(self.folder, 'bin', 'i18ndude')
+        with open(i18ndude, 'w') as script:
+            script.write(I18NDUDE)
+        os.chmod(i18ndude, os.stat(i18ndude).st_mode | stat.S_IEXEC)
+
+        self._write('src/one.pt', '<p i18n:translate="">One</p>')
+        self._write('src/two.pt', '<p i18n:translate="">Two</p>')
+        self._write('src/code.py', 'print("three")')
+        self.repo.index.commit('Templates')
+        self.repo.create_tag('1.0')
+
+        cache = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.folder})
+        cache.start()
+        self.addCleanup(cache.stop)
+
+    def tearDown(self):
+        self.repo.close()
+        shutil.rmtree(self.folder)
+
+    def _write(self, path, contents):
+        full_path = os.path.join(self.folder, path)
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        with open(full_path, 'w') as a_file:
+            a_file.write(contents)
+        self.repo.index.add([path])
+
+    def _calls(self):
+        try:
+            with open(os.path.join(self.folder, 'calls.log')) as log:
+                return log.read().splitlines()
+        except OSError:
+            return []
+
+    def test_changed_templates(self):
+        """Check that only templates changed since the last tag are given"""
+        self._write('src/two.pt', '<p>Two</p>')
+        self._write('src/code.py', 'print("four")')
+        self.repo.index.commit('Change')
+        self.assertEqual(changed_templates(self.folder), ['src/two.pt'])
+
+    def test_changed_templates_no_tag(self):
+        """Check that without a tag all templates are given"""
+        self.repo.delete_tag('1.0')
+        self.assertEqual(changed_templates(self.folder), ['src/one.pt', 'src/two.pt'])
+
+    def test_nothing_changed(self):
+        """Check that i18ndude is not run if no template changed"""
+        check_translations({'workingdir': self.folder})
+        self.assertEqual(self._calls(), [])
+
+    def test_clean_templates_are_cached(self):
+        """Check that templates found to be fine are not checked again"""
+        self._write('src/one.pt', '<p i18n:translate="">Uno</p>')
+        self.repo.index.commit('Change')
+
+        check_translations({'workingdir': self.folder})
+        check_translations({'workingdir': self.folder})
+        self.assertEqual(self._calls(), ['-n src/one.pt'])
+
+        # a change on the template is checked again
+        self._write('src/one.pt', '<p i18n:translate="">Eins</p>')
+        check_translations({'workingdir': self.folder})
+        self.assertEqual(len(self._calls()), 2)
+
+    def test_untranslated(self):
+        """Check that untranslated strings are reported and not cached"""
+        self._write('src/one.pt', '<p>untranslated</p>')
+        self._write('src/two.pt', '<p i18n:translate="">Zwei</p>')
+        self.repo.index.commit('Change')
+
+        with mock.patch('freitag.releaser.prerelease.ask', return_value=True) as ask:
+            with LogCapture():
+                check_translations({'workingdir': self.folder})
+                check_translations({'workingdir': self.folder})
+
+        self.assertEqual(ask.call_count, 2)
+        self.assertEqual(self._calls(), ['-n src/one.pt src/two.pt', '-n src/one.pt'])
+
+    def test_reported_paths_match_exactly(self):
+        """Check that a template is not taken for another one it is part of"""
+        self._write('src/one.pt', '<p i18n:translate="">Uno</p>')
+        self._write('src/one.pt.html', '<p>untranslated</p>')
+        self.repo.index.commit('Change')
+
+        with mock.patch('freitag.releaser.prerelease.ask', return_value=True):
+            with LogCapture():
+                check_translations({'workingdir': self.folder})
+                check_translations({'workingdir': self.folder})
+
+        self.assertEqual(
+            self._calls(),
+            ['-n src/one.pt src/one.pt.html', '-n src/one.pt.html'],
+        )
+
+    def test_empty_timeout(self):
+        """Check that an empty timeout waits for as long as it takes"""
+        environ = {'FREITAG_RELEASER_I18N_TIMEOUT': ''}
+        with mock.patch.dict(os.environ, environ):
+            self.assertIsNone(_timeout())
+
+    def test_timeout(self):
+        """Check that i18ndude is stopped if it takes too long"""
+        self._write('src/one.pt', '<p>slow</p>')
+        self.repo.index.commit('Change')
+
+        environ = {'FREITAG_RELEASER_I18N_TIMEOUT': '0.5'}
+        with mock.patch.dict(os.environ, environ), LogCapture() as output:
+            with mock.patch('freitag.releaser.prerelease.ask', return_value=False):
+                with self.assertRaises(SystemExit):
+                    check_translations({'workingdir': self.folder})
+
+        self.assertIn('i18ndude did not finish in time', str(output))
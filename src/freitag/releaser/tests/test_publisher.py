@@ -0,0 +1,237 @@
+from freitag.releaser.index import ReleaseIndex
+from freitag.releaser.manage import publish_cfg_files
+from freitag.releaser.publisher import checksum
+from freitag.releaser.publisher import MANIFEST
+from freitag.releaser.publisher import Publisher
+from freitag.releaser.utils import push_cfg_files
+from freitag.releaser.utils import wrap_folder
+from tempfile import mkdtemp
+from testfixtures import LogCapture
+from unittest import mock
+
+import io
+import os
+import shutil
+import unittest
+
+
+SERVERS = [
+    ('user', 'one.example.com', '/srv/cfg'),
+    ('user', 'two.example.com', '/srv/cfg'),
+]
+
+
+class FakeSFTP:
+    """In-memory SFTP server"""
+
+    def __init__(self):
+        self.files = {}
+        self.uploads = []
+        self.closed = False
+
+    def open(self, path):
+        if path not in self.files:
+            raise FileNotFoundError(path)
+        return io.BytesIO(self.files[path])
+
+    def put(self, local, remote):
+        with open(local, 'rb') as a_file:
+            self.files[remote] = a_file.read()
+        self.uploads.append(remote)
+
+    def putfo(self, data, remote):
+        self.files[remote] = data.read()
+
+    def posix_rename(self, old, new):
+        self.files[new] = self.files.pop(old)
+
+    def close(self):
+        self.closed = True
+
+
+class TestPublisher(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.files = []
+        for name in ('versions.cfg', 'sources.cfg'):
+            path = os.path.join(self.folder, name)
+            with open(path, 'w') as cfg_file:
+                cfg_file.write('[buildout]\n')
+            self.files.append(path)
+
+        self.connections = {}
+        patcher = mock.patch.object(Publisher, '_connect', self._connect)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _connect(self, user, server):
+        if server == 'down.example.com':
+            raise OSError('Connection refused')
+        connection = (mock.Mock(), FakeSFTP())
+        self.connections.setdefault(server, []).append(connection)
+        return connection
+
+    def test_publish_all_servers(self):
+        """Check that the files are uploaded to every server"""
+        with LogCapture() as output:
+            with Publisher(SERVERS) as publisher:
+                results = publisher.publish(self.files)
+
+        self.assertEqual(
+            [(result['server'], result['error']) for result in results],
+            [
+                ('user@one.example.com:/srv/cfg', None),
+                ('user@two.example.com:/srv/cfg', None),
+            ],
+        )
+        for server in ('one.example.com', 'two.example.com'):
+            sftp = self.connections[server][0][1]
+            self.assertEqual(
+                sorted(sftp.uploads),
+                ['/srv/cfg/sources.cfg', '/srv/cfg/versions.cfg'],
+            )
+            self.assertIn(f'/srv/cfg/{MANIFEST}', sftp.files)
+        self.assertIn(
+            'Pushed 2 files (0 unchanged) to user@one.example.com', str(output)
+        )
+
+    def test_connections_are_pooled(self):
+        """Check that a server is connected to only once"""
+        with Publisher(SERVERS) as publisher:
+            publisher.publish(self.files)
+            publisher.publish(self.files, force=True)
+
+        self.assertEqual(len(self.connections['one.example.com']), 1)
+        sftp = self.connections['one.example.com'][0][1]
+        self.assertEqual(len(sftp.uploads), 4)
+
+    def test_unchanged_files_are_skipped(self):
+        """Check that only files that changed are uploaded again"""
+        with Publisher(SERVERS[:1]) as publisher:
+            publisher.publish(self.files)
+            with open(self.files[1], 'a') as cfg_file:
+                cfg_file.write('parts =\n')
+            results = publisher.publish(self.files)
+
+        self.assertEqual(results[0]['uploaded'], ['sources.cfg'])
+        sftp = self.connections['one.example.com'][0][1]
+        self.assertEqual(len(sftp.uploads), 3)
+        self.assertEqual(sftp.files['/srv/cfg/sources.cfg'], b'[buildout]\nparts =\n')
+
+    def test_cache_skips_hashing(self):
+        """Check that unchanged files are not hashed again, yet every server
+        is still connected to and its manifest is what counts
+        """
+        cache_file = os.path.join(self.folder, 'push.json')
+        with Publisher(SERVERS, cache=ReleaseIndex(cache_file)) as publisher:
+            publisher.publish(self.files)
+
+        # the servers are connected again, and as they are new (empty) ones
+        # the files are uploaded again
+        with (
+            Publisher(SERVERS, cache=ReleaseIndex(cache_file)) as publisher,
+            mock.patch('freitag.releaser.publisher.checksum') as checksum,
+        ):
+            results = publisher.publish(self.files)
+
+        checksum.assert_not_called()
+        self.assertEqual(len(self.connections['one.example.com']), 2)
+        self.assertEqual(len(self.connections['two.example.com']), 2)
+        self.assertEqual(
+            [sorted(result['uploaded']) for result in results],
+            [['sources.cfg', 'versions.cfg'], ['sources.cfg', 'versions.cfg']],
+        )
+
+    def test_cache_outdated(self):
+        """Check that files are hashed again once they change"""
+        cache = ReleaseIndex()
+        with Publisher(SERVERS[:1], cache=cache) as publisher:
+            publisher.publish(self.files)
+            with open(self.files[1], 'a') as cfg_file:
+                cfg_file.write('parts =\n')
+            with mock.patch(
+                'freitag.releaser.publisher.checksum', wraps=checksum
+            ) as wrapped:
+                results = publisher.publish(self.files)
+
+        wrapped.assert_called_once_with(self.files[1])
+        self.assertEqual(results[0]['uploaded'], ['sources.cfg'])
+
+    def test_broken_manifest(self):
+        """Check that all files are uploaded if the manifest is not readable"""
+        with Publisher(SERVERS[:1]) as publisher:
+            publisher.publish(self.files)
+            sftp = self.connections['one.example.com'][0][1]
+            sftp.files[f'/srv/cfg/{MANIFEST}'] = b'not json'
+            results = publisher.publish(self.files)
+
+        self.assertEqual(len(results[0]['uploaded']), 2)
+
+    def test_close(self):
+        """Check that closing the publisher closes the connections"""
+        publisher = Publisher(SERVERS[:1])
+        publisher.publish(self.files)
+        publisher.close()
+
+        client, sftp = self.connections['one.example.com'][0]
+        self.assertTrue(sftp.closed)
+        client.close.assert_called_once_with()
+
+    def test_failing_server(self):
+        """Check that a failing server does not prevent the others"""
+        servers = [('user', 'down.example.com', '/srv/cfg')] + SERVERS[:1]
+        with LogCapture() as output:
+            with Publisher(servers) as publisher:
+                results = publisher.publish(self.files)
+
+        self.assertEqual(results[0]['error'], 'Connection refused')
+        self.assertIsNone(results[1]['error'])
+        self.assertIn(
+            'Could not push to user@down.example.com:/srv/cfg: Connection refused',
+            str(output),
+        )
+
+    def test_ssh_config(self):
+        """Check that ~/.ssh/config settings are used to connect"""
+        config_path = os.path.join(self.folder, 'ssh_config')
+        with open(config_path, 'w') as config_file:
+            config_file.write('Host one\n    HostName one.example.com\n    Port 2222\n')
+
+        publisher = Publisher(SERVERS, ssh_config_file=config_path)
+        options = publisher._connect_options('user', 'one')
+        self.assertEqual(options['hostname'], 'one.example.com')
+        self.assertEqual(options['port'], 2222)
+        self.assertEqual(options['username'], 'user')
+
+    def test_push_cfg_files_error(self):
+        """Check that push_cfg_files raises if a server could not be pushed"""
+        with open(os.path.join(self.folder, 'release.cfg'), 'w') as cfg_file:
+            cfg_file.write('[eggs]\nservers =\n    user@down.example.com:/srv\n')
+
+        cache = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.folder})
+        with wrap_folder(self.folder), cache, LogCapture():
+            with self.assertRaises(OSError):
+                push_cfg_files(self.files)
+
+    def test_push_command_error(self):
+        """Check that the push command exits with an error if a server could
+        not be pushed
+        """
+        with open(os.path.join(self.folder, 'release.cfg'), 'w') as cfg_file:
+            cfg_file.write('[eggs]\nservers =\n    user@down.example.com:/srv\n')
+        with open(os.path.join(self.folder, 'qa.cfg'), 'w') as cfg_file:
+            cfg_file.write('[buildout]\n')
+
+        cache = mock.patch.dict(os.environ, {'XDG_CACHE_HOME': self.folder})
+        with wrap_folder(self.folder), cache, LogCapture() as output:
+            with self.assertRaises(SystemExit) as context:
+                publish_cfg_files()
+
+        self.assertEqual(context.exception.code, 1)
+        self.assertIn(
+            'Could not push cfg files to user@down.example.com:/srv',
+            str(output),
+        )
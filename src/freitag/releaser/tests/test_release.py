@@ -1,13 +1,18 @@
+from freitag.releaser.plan import merge_plans
+from freitag.releaser.plan import read_plan
 from freitag.releaser.release import FullRelease
 from freitag.releaser.release import ReleaseDistribution
+from freitag.releaser.tracing import Tracer
 from freitag.releaser.utils import is_branch_synced
 from freitag.releaser.utils import wrap_folder
 from git import Repo
 from tempfile import mkdtemp
 from testfixtures import LogCapture
 from testfixtures import OutputCapture
+from unittest import mock
 from zest.releaser import utils
 
+import json
 import os
 import shutil
 import unittest
@@ -108,6 +113,60 @@ class TestFullRelease(BaseTest):
         self.assertEqual(full_release.test, test)
         self.assertEqual(full_release.filters, dist_filter)
 
+    def test_instances_do_not_share_state(self):
+        """Check that each instance has its own distributions, versions..."""
+        first = FullRelease()
+        first.distributions.append('src/one')
+        first.versions['one'] = '1.0'
+        first.last_tags['one'] = '0.9'
+        first.changelogs['one'] = ['- change']
+
+        second = FullRelease()
+        self.assertEqual(second.distributions, [])
+        self.assertEqual(second.versions, {})
+        self.assertEqual(second.last_tags, {})
+        self.assertEqual(second.changelogs, {})
+
+    def test_prefetch(self):
+        """Check that all distributions and the parent repository are fetched"""
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        self.buildout_repo.clone(f'{path}/my.distribution')
+        broken = self.buildout_repo.clone(f'{path}/broken.distribution')
+        broken.remote().set_url('/non/existing/repository')
+
+        with wrap_folder(self.user_buildout_repo.working_tree_dir):
+            full_release = FullRelease(path='src')
+            with LogCapture() as output:
+                failed = full_release.prefetch()
+            fetched = [
+                path
+                for path in ['.', 'src/my.distribution']
+                if full_release.session.last_fetched(full_release.session.repo(path))
+            ]
+            full_release.session.close()
+
+        self.assertEqual(failed, ['src/broken.distribution'])
+        self.assertEqual(fetched, ['.', 'src/my.distribution'])
+        self.assertIn('Could not fetch src/broken.distribution', str(output))
+
+    def test_prefetch_not_a_repository(self):
+        """Check that a parent folder that is not a repository is reported"""
+        folder = mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        os.makedirs(f'{folder}/src')
+        self.buildout_repo.clone(f'{folder}/src/my.distribution')
+
+        with wrap_folder(folder):
+            full_release = FullRelease(path='src')
+            with LogCapture() as output:
+                failed = full_release.prefetch()
+            full_release.session.close()
+
+        self.assertEqual(failed, ['.'])
+        self.assertIn('Could not fetch .', str(output))
+        self.assertIn('Fetched 1 repositories', str(output))
+
     def test_get_all_distributions_folder(self):
         """Check that a folder is not considered a distribution"""
         path = f'{self.user_buildout_repo.working_tree_dir}/src'
@@ -261,6 +320,24 @@ class TestFullRelease(BaseTest):
         with OutputCapture():
             self.assertRaises(SystemExit, full_release.check_pending_local_changes)
 
+    def test_check_pending_local_changes_answers_file(self):
+        """Check that the answers file decides whether to go on"""
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        repo_folder = f'{path}/my.distribution'
+        repo = self.buildout_repo.clone(repo_folder)
+        self._commit(repo)
+
+        answers_file = f'{self.user_buildout_repo.working_tree_dir}/answers.cfg'
+        with open(answers_file, 'w') as answers:
+            answers.write('[freitag.releaser]\ncontinue = no\n')
+
+        full_release = FullRelease(path=path, answers_file=answers_file)
+        full_release.distributions = [repo_folder]
+        with mock.patch('freitag.releaser.release.ask') as ask, LogCapture():
+            self.assertRaises(SystemExit, full_release.check_pending_local_changes)
+        ask.assert_not_called()
+
     def test_check_pending_local_changes_unpushed_test(self):
         """Check that a repository with local commits is *not* removed from
         the list of distributions to be released if test is True
@@ -311,6 +388,28 @@ class TestFullRelease(BaseTest):
             [repo_folder],
         )
 
+    def test_iter_pending_local_changes(self):
+        """Check that only the clean distributions are yielded, and that
+        the user is asked only once to continue
+        """
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        clean_folder = f'{path}/my.distribution'
+        self.buildout_repo.clone(clean_folder)
+        dirty_folders = [f'{path}/my.dirty', f'{path}/my.other.dirty']
+        for folder in dirty_folders:
+            self._commit(self.buildout_repo.clone(folder))
+
+        full_release = FullRelease(path=path, jobs=3)
+
+        utils.test_answer_book.set_answers(['Y'])
+        with OutputCapture():
+            distributions = list(
+                full_release.iter_pending_local_changes([clean_folder] + dirty_folders)
+            )
+
+        self.assertEqual(distributions, [clean_folder])
+
     def test_changes_to_be_released_no_tag(self):
         """Check that if a distribution does not have any tag is kept as a
         distribution that needs to be released
@@ -337,6 +436,110 @@ class TestFullRelease(BaseTest):
         # check that the distribution is still there
         self.assertEqual(full_release.distributions, [repo_folder])
 
+    def test_changes_to_be_released_traced(self):
+        """Check that the git operations of each distribution are traced"""
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        repo_folder = f'{path}/my.distribution'
+        repo = self.buildout_repo.clone(repo_folder)
+        self._commit(repo)
+        self._commit(repo)
+        repo.remote().push()
+
+        full_release = FullRelease(path=path, tracer=Tracer())
+        full_release.distributions = [repo_folder]
+        with OutputCapture():
+            full_release.check_changes_to_be_released()
+
+        span = full_release.tracer.events[0]
+        self.assertEqual(span['name'], 'get_latest_tag')
+        self.assertEqual(span['args'], {'distribution': repo_folder})
+
+    def test_release_plan(self):
+        """Check that a record is printed for each distribution"""
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        pending = self.buildout_repo.clone(f'{path}/b.distribution')
+        self._commit(pending, msg='Before the tag')
+        pending.create_tag('1.0')
+        self._commit(pending, msg='Fix something')
+        os.makedirs(f'{path}/b.distribution/news')
+        self._commit(pending, content='Fixed', filename='news/12.bugfix')
+        pending.remote().push()
+        released = self.buildout_repo.clone(f'{path}/a.distribution')
+        released.create_tag('2.0')
+
+        with wrap_folder(self.user_buildout_repo.working_tree_dir):
+            full_release = FullRelease(offline=True, output_format='ndjson')
+            with OutputCapture(separate=True) as output, LogCapture():
+                full_release()
+        records = [json.loads(line) for line in output.stdout.getvalue().splitlines()]
+
+        self.assertEqual(
+            [record['path'] for record in records],
+            ['src/a.distribution', 'src/b.distribution'],
+        )
+        self.assertFalse(records[0]['needs_release'])
+        self.assertEqual(records[0]['pending_commits'], 0)
+        record = records[1]
+        self.assertEqual(record['last_tag'], '1.0')
+        self.assertEqual(record['branch_sha'], pending.head.commit.hexsha)
+        self.assertEqual(record['pending_commits'], 2)
+        self.assertEqual(len(record['history']), 2)
+        self.assertIn('Fix something', record['history'][1])
+        self.assertEqual(record['news'], ['12.bugfix'])
+        self.assertEqual(record['next_release'], 'bugfix')
+        self.assertTrue(record['needs_release'])
+
+    def test_release_plan_shards(self):
+        """Check that merging the plans of all shards gives the whole plan"""
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        for name in ('a', 'b', 'c'):
+            repo = self.buildout_repo.clone(f'{path}/{name}.distribution')
+            repo.create_tag('1.0')
+            self._commit(repo, msg=f'Change {name}')
+
+        def plan(shard=None):
+            with wrap_folder(self.user_buildout_repo.working_tree_dir):
+                full_release = FullRelease(
+                    offline=True, output_format='json', shard=shard
+                )
+                with OutputCapture(separate=True) as output, LogCapture():
+                    full_release()
+            plan_path = f'{path}/../plan-{shard}.json'
+            with open(plan_path, 'w') as plan_file:
+                plan_file.write(output.stdout.getvalue())
+            return plan_path
+
+        whole = read_plan(plan())
+        shards = [plan((1, 2)), plan((2, 2))]
+        self.assertEqual(len(read_plan(shards[0])), 2)
+        self.assertEqual(merge_plans(shards), whole)
+
+    def test_release_plan_closed_on_errors(self):
+        """Check that the plan is written even if the review fails"""
+        with wrap_folder(self.user_buildout_repo.working_tree_dir):
+            os.makedirs('src')
+            full_release = FullRelease(offline=True, output_format='json')
+            with (
+                mock.patch.object(full_release.plan, 'close') as close,
+                mock.patch.object(
+                    full_release, 'ask_what_to_release', side_effect=ValueError
+                ),
+                LogCapture(),
+            ):
+                with self.assertRaises(ValueError):
+                    full_release()
+
+        close.assert_called_once_with()
+
+    def test_release_plan_turns_test_on(self):
+        """Check that asking for a release plan does not release anything"""
+        with LogCapture():
+            full_release = FullRelease(output_format='json')
+        self.assertTrue(full_release.test)
+
     def test_changes_to_be_released_nothing_to_release(self):
         """Check that if there is a tag on the last commit the distribution is
         removed from the list of distributions needing a release
@@ -472,6 +675,48 @@ class TestFullRelease(BaseTest):
         ]
         self.assertEqual(len(commit), 1)
 
+    def test_changes_to_be_released_index(self):
+        """Check that the release status is stored on the index and reused
+        while the distribution does not change
+        """
+        # create repo
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        repo_folder = f'{path}/my.distribution'
+        repo = self.buildout_repo.clone(repo_folder)
+        repo.create_tag('my-tag')
+        self._commit(repo)
+        repo.remote().push()
+
+        index_file = f'{self.user_buildout_repo.working_tree_dir}/index.json'
+        full_release = FullRelease(path=path, index_file=index_file)
+        full_release.distributions = [repo_folder]
+        with OutputCapture():
+            full_release.check_changes_to_be_released()
+
+        with open(index_file) as a_file:
+            entry = json.load(a_file)['entries'][repo_folder]
+        self.assertEqual(entry['data']['last_tag'], 'my-tag')
+        self.assertTrue(entry['data']['needs_release'])
+
+        # nothing changed: git is not asked again
+        full_release = FullRelease(path=path, index_file=index_file)
+        full_release.distributions = [repo_folder]
+        with mock.patch('freitag.releaser.release.get_latest_tag') as latest_tag:
+            with OutputCapture():
+                full_release.check_changes_to_be_released()
+        latest_tag.assert_not_called()
+        self.assertEqual(full_release.distributions, [repo_folder])
+
+        # a new tag is created: the status is computed again
+        repo.create_tag('my-new-tag')
+        full_release = FullRelease(path=path, index_file=index_file)
+        full_release.distributions = [repo_folder]
+        with OutputCapture():
+            full_release.check_changes_to_be_released()
+        self.assertEqual(full_release.distributions, [])
+        self.assertEqual(full_release.last_tags['my.distribution'], 'my-new-tag')
+
     def test_ask_what_to_release_clean_some_lines_of_git_history(self):
         """Check that if the some commits are administrative they are not
         shown to the user, the other non-administrative are shown
@@ -613,6 +858,51 @@ class TestFullRelease(BaseTest):
             'Is the change log for my.distribution ready for release?', output.captured
         )
 
+    def test_ask_what_to_release_answers_file(self):
+        """Check that answers given beforehand are used instead of asking"""
+        repo = self.user_buildout_repo
+        self._add_source(repo)
+        self._add_changes(repo)
+        first_commit_sha = self._commit(repo, msg='Random commit 1')
+        self.user_buildout_repo.remote().push()
+
+        path = f'{self.user_buildout_repo.working_tree_dir}/src'
+        os.makedirs(path)
+        repo_folder = f'{path}/my.distribution'
+        self.buildout_repo.clone(repo_folder)
+
+        answers_file = f'{self.user_buildout_repo.working_tree_dir}/answers.json'
+        with open(answers_file, 'w') as answers:
+            json.dump(
+                {
+                    'distributions': {
+                        'my.distribution': {'release': True, 'bump': 'feature'}
+                    }
+                },
+                answers,
+            )
+
+        full_release = FullRelease(path=path, answers_file=answers_file)
+        full_release.distributions = [repo_folder]
+        full_release.last_tags['my.distribution'] = first_commit_sha
+
+        with mock.patch('freitag.releaser.release.ask') as ask:
+            with wrap_folder(self.user_buildout_repo.working_tree_dir):
+                with LogCapture() as output:
+                    full_release.ask_what_to_release()
+
+        ask.assert_not_called()
+        self.assertEqual(full_release.distributions, [repo_folder])
+        self.assertEqual(full_release.next_releases, {repo_folder: 'feature'})
+        self.assertIn(
+            'Is the change log for my.distribution ready for release? yes', str(output)
+        )
+
+        with mock.patch('freitag.releaser.release.ReleaseWorker') as worker:
+            full_release.decide_versions()
+        worker.assert_called_once_with(repo_folder)
+        worker().run.assert_called_once_with('bumpversion', '--feature', '--no-input')
+
     def test_update_buildout(self):
         """Check that repository is updated with commit message"""
         path = self.user_buildout_repo.working_tree_dir
@@ -631,6 +921,64 @@ class TestFullRelease(BaseTest):
         self.assertEqual(commit.message.strip(), message)
         self.assertTrue(is_branch_synced(self.user_buildout_repo))
 
+    def test_release_all_pins_versions(self):
+        """Check that the released versions are pinned, even on failures"""
+        path = self.user_buildout_repo.working_tree_dir
+
+        def release(path, branch):
+            if path.endswith('broken'):
+                return mock.Mock(side_effect=ValueError('broken'))
+            return mock.Mock(return_value='2.0')
+
+        with wrap_folder(path):
+            with open('versions.cfg', 'w') as versions:
+                versions.write('[versions]\n# ours\nmy.distribution = 1.0\n')
+
+            full_release = FullRelease()
+            full_release.versions = {}
+            full_release.distributions = ['src/my.distribution', 'src/broken']
+            with (
+                mock.patch.multiple(
+                    'freitag.releaser.release',
+                    ReleaseDistribution=release,
+                    release_waves=lambda paths: [paths],
+                    update_branch=mock.DEFAULT,
+                    time=mock.DEFAULT,
+                ),
+                mock.patch.object(
+                    full_release.session,
+                    'repo',
+                    lambda path: mock.Mock(working_tree_dir=path),
+                ),
+                LogCapture(),
+            ):
+                with self.assertRaises(ValueError):
+                    full_release.release_all()
+
+            with open('versions.cfg') as versions:
+                data = versions.read()
+
+        self.assertEqual(data, '[versions]\n# ours\nmy.distribution = 2.0\n')
+
+    def test_release_waves_no_jobs(self):
+        """Check that distributions are released even with --jobs 0"""
+        full_release = FullRelease(jobs=0)
+        released = []
+        with (
+            mock.patch.object(
+                full_release, '_release_distribution', return_value='2.0'
+            ),
+            mock.patch.object(
+                full_release,
+                '_released',
+                lambda path, version: released.append((path, version)),
+            ),
+            LogCapture(),
+        ):
+            full_release._release_waves([['src/one', 'src/two']])
+
+        self.assertEqual(released, [('src/one', '2.0'), ('src/two', '2.0')])
+
     def test_create_commit_message(self):
         """Check that the commit message is generated correctly"""
         full_release = FullRelease()
@@ -765,6 +1113,42 @@ class TestFullRelease(BaseTest):
         shutil.rmtree(remote_batou.working_dir)
         shutil.rmtree(tmp_batou_repo.working_tree_dir)
 
+    def test_update_batou_mirror(self):
+        """Check that batou repository is cloned out of a local mirror"""
+        buildout_path = self.user_buildout_repo.working_tree_dir
+        remote_batou = Repo.init(mkdtemp(), bare=True)
+        tmp_batou_repo = remote_batou.clone(mkdtemp())
+        folder_path = f'{tmp_batou_repo.working_tree_dir}/components/plone/versions'
+        os.makedirs(folder_path)
+        with open(f'{folder_path}/versions.cfg', 'w') as versions:
+            versions.write('[versions]')
+        tmp_batou_repo.index.add([f'{folder_path}/versions.cfg'])
+        tmp_batou_repo.index.commit('lalala')
+        tmp_batou_repo.remote().push('HEAD:refs/heads/main')
+        shutil.rmtree(tmp_batou_repo.working_dir)
+        mirrors_folder = mkdtemp()
+
+        with wrap_folder(buildout_path):
+            with open('sources.cfg', 'w') as versions:
+                versions.write('[sources]\n')
+                versions.write(f'deployment = git file://{remote_batou.working_dir}')
+
+            for number, version in enumerate(('4.3', '4.4')):
+                full_release = FullRelease(mirrors_folder=mirrors_folder)
+                full_release.commit_message = f'Release {number}'
+                full_release.versions = {'der.freitag': version}
+                full_release.update_batou()
+
+        self.assertEqual(len(os.listdir(mirrors_folder)), 1)
+        branch = remote_batou.branches['main']
+        self.assertEqual(branch.commit.message, 'Release 1')
+        self.assertEqual(branch.commit.parents[0].message, 'Release 0')
+        versions = branch.commit.tree['components/plone/versions/versions.cfg']
+        self.assertIn('der.freitag = 4.4', versions.data_stream.read().decode())
+
+        shutil.rmtree(remote_batou.working_dir)
+        shutil.rmtree(mirrors_folder)
+
 
 class TestReleaseDistribution(BaseTest):
     def test_create_instance(self):
@@ -0,0 +1,115 @@
+from freitag.releaser.session import RepoSession
+from freitag.releaser.utils import is_branch_synced
+from freitag.releaser.utils import update_branch
+from git import Repo
+from tempfile import mkdtemp
+
+import os
+import shutil
+import unittest
+
+
+class TestRepoSession(unittest.TestCase):
+    def setUp(self):
+        self.upstream_repo = Repo.init(mkdtemp(), bare=True)
+
+        self.remote_repo = self.upstream_repo.clone(mkdtemp())
+        self._commit(self.remote_repo, msg='First commit')
+        self.remote_repo.create_head('main')
+        self.remote_repo.remote().push('main:refs/heads/main')
+
+        self.user_repo = self.upstream_repo.clone(mkdtemp())
+        self.user_repo.git.checkout('main')
+
+        self.session = RepoSession()
+
+    def tearDown(self):
+        self.session.close()
+        shutil.rmtree(self.upstream_repo.working_dir)
+        shutil.rmtree(self.remote_repo.working_dir)
+        shutil.rmtree(self.user_repo.working_dir)
+
+    def _commit(self, repo, msg='Random commit'):
+        dummy_file = os.path.join(repo.working_tree_dir, 'dummy')
+        with open(dummy_file, 'a') as a_file:
+            a_file.write(msg)
+        repo.index.add([dummy_file])
+        repo.index.commit(msg)
+
+    def _push_upstream_commit(self):
+        self._commit(self.remote_repo, msg='Another commit')
+        self.remote_repo.remote().push()
+
+    def test_repo_is_reused(self):
+        """Check that the same path always gives the same repository"""
+        path = self.user_repo.working_dir
+        repo = self.session.repo(path)
+        self.assertIs(repo, self.session.repo(f'{path}/'))
+        self.assertIsNot(repo, self.user_repo)
+
+    def test_fetch_only_once(self):
+        """Check that a repository is only fetched once per session"""
+        repo = self.session.repo(self.user_repo.working_dir)
+        self.assertIsNone(self.session.last_fetched(repo))
+
+        self.assertTrue(self.session.fetch(repo))
+        self.assertIsNotNone(self.session.last_fetched(repo))
+        self.assertFalse(self.session.fetch(repo))
+        self.assertTrue(self.session.fetch(repo, force=True))
+
+    def test_fetch_fresh(self):
+        """Check that recently fetched repositories are not fetched again"""
+        self.user_repo.remote().fetch()
+        self._push_upstream_commit()
+
+        with RepoSession(fresh=60) as session:
+            repo = session.repo(self.user_repo.working_dir)
+            self.assertFalse(session.fetch(repo))
+            self.assertIsNotNone(session.last_fetched(repo))
+            self.assertTrue(is_branch_synced(repo, session=session))
+
+            # an old fetch is not trusted
+            fetch_head = os.path.join(repo.git_dir, 'FETCH_HEAD')
+            os.utime(fetch_head, (0, 0))
+            self.assertTrue(session.fetch(repo, force=True))
+            self.assertFalse(is_branch_synced(repo, fetch=False))
+
+    def test_fetch_fresh_never_fetched(self):
+        """Check that a repository that was never fetched is fetched"""
+        with RepoSession(fresh=60) as session:
+            repo = session.repo(self.user_repo.working_dir)
+            self.assertTrue(session.fetch(repo))
+
+    def test_is_branch_synced_reuses_fetch(self):
+        """Check that is_branch_synced does not fetch again within a session"""
+        repo = self.session.repo(self.user_repo.working_dir)
+        self.assertTrue(is_branch_synced(repo, session=self.session))
+
+        # new upstream changes are not seen, the repository was fetched
+        self._push_upstream_commit()
+        self.assertTrue(is_branch_synced(repo, session=self.session))
+
+        # on a new session they are
+        with RepoSession() as session:
+            repo = session.repo(self.user_repo.working_dir)
+            self.assertFalse(is_branch_synced(repo, session=session))
+
+    def test_update_branch_reuses_fetch(self):
+        """Check that update_branch relies on the previous fetch"""
+        self._push_upstream_commit()
+        repo = self.session.repo(self.user_repo.working_dir)
+        self.session.fetch(repo)
+
+        update_branch(repo, 'main', session=self.session)
+
+        self.assertEqual(repo.head.commit.hexsha, self.remote_repo.head.commit.hexsha)
+
+    def test_close(self):
+        """Check that closing the session forgets about all repositories"""
+        repo = self.session.repo(self.user_repo.working_dir)
+        self.session.fetch(repo)
+
+        self.session.close()
+
+        self.assertIsNone(self.session.last_fetched(repo))
+        self.assertIsNot(repo, self.session.repo(self.user_repo.working_dir))
@@ -0,0 +1,64 @@
+from freitag.releaser.tracing import Tracer
+from tempfile import mkdtemp
+
+import json
+import os
+import shutil
+import threading
+import unittest
+
+
+class TestTracer(unittest.TestCase):
+    def test_spans(self):
+        """Check that nested spans are recorded with their arguments"""
+        tracer = Tracer()
+        with tracer.span('phase', 'phase'):
+            with tracer.span('fetch', 'network', distribution='src/one'):
+                pass
+
+        inner, outer = tracer.events
+        self.assertEqual(outer['name'], 'phase')
+        self.assertEqual(inner['args'], {'distribution': 'src/one'})
+        self.assertEqual(inner['ph'], 'X')
+        self.assertGreaterEqual(inner['ts'], outer['ts'])
+        self.assertLessEqual(inner['dur'], outer['dur'])
+
+    def test_span_on_error(self):
+        """Check that a span is recorded even if an error happens"""
+        tracer = Tracer()
+        with self.assertRaises(ValueError):
+            with tracer.span('failing'):
+                raise ValueError
+        self.assertEqual(tracer.events[0]['name'], 'failing')
+
+    def test_disabled(self):
+        """Check that a disabled tracer does not record anything"""
+        tracer = Tracer(enabled=False)
+        with tracer.span('phase'):
+            pass
+        self.assertEqual(tracer.events, [])
+
+    def test_write(self):
+        """Check that spans from all threads are written"""
+        tracer = Tracer()
+
+        def work():
+            with tracer.span('worker'):
+                pass
+
+        thread = threading.Thread(target=work, name='worker-thread')
+        with tracer.span('main'):
+            thread.start()
+            thread.join()
+
+        folder = mkdtemp()
+        self.addCleanup(shutil.rmtree, folder)
+        path = os.path.join(folder, 'trace.json')
+        tracer.write(path)
+
+        with open(path) as trace_file:
+            events = json.load(trace_file)['traceEvents']
+        spans = {event['name'] for event in events if event['ph'] == 'X'}
+        self.assertEqual(spans, {'main', 'worker'})
+        threads = {event['args']['name'] for event in events if event['ph'] == 'M'}
+        self.assertIn('worker-thread', threads)
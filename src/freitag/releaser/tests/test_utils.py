@@ -1,18 +1,35 @@
+from freitag.releaser.utils import compile_commit_filter
+from freitag.releaser.utils import filter_git_history
 from freitag.releaser.utils import get_compact_git_history
+from freitag.releaser.utils import get_ignore_commit_messages
+from freitag.releaser.utils import get_latest_tag
+from freitag.releaser.utils import get_refs_fingerprint
+from freitag.releaser.utils import get_refs_snapshot
+from freitag.releaser.utils import get_second_oldest_commit
 from freitag.releaser.utils import git_repo
 from freitag.releaser.utils import is_branch_synced
+from freitag.releaser.utils import iter_compact_git_history
+from freitag.releaser.utils import iter_concurrently
+from freitag.releaser.utils import iter_filtered_git_history
+from freitag.releaser.utils import prefetch
 from freitag.releaser.utils import update_branch
+from freitag.releaser.utils import update_mirror
 from freitag.releaser.utils import wrap_folder
 from freitag.releaser.utils import wrap_sys_argv
+from git import Git
 from git import Repo
+from git.exc import GitCommandError
 from plone.releaser.buildout import Source
 from tempfile import mkdtemp
 from testfixtures import LogCapture
 from testfixtures import OutputCapture
+from unittest import mock
 
 import os
 import shutil
+import subprocess
 import sys
+import threading
 import unittest
 
 
@@ -46,6 +63,23 @@ class TestUtils(unittest.TestCase):
         repo.index.add([dummy_file])
         repo.index.commit(msg)
 
+    def _fast_import(self, repo, commits):
+        """Create a linear history of the given amount of commits on main"""
+        stream = []
+        for number in range(1, commits + 1):
+            message = f'Commit {number}'.encode()
+            stream.append(b'commit refs/heads/main')
+            stream.append(b'committer Tester <tester@example.com> %d +0000' % number)
+            stream.append(b'data %d' % len(message))
+            stream.append(message)
+            stream.append(b'')
+        subprocess.run(
+            ['git', 'fast-import', '--quiet'],
+            input=b'\n'.join(stream),
+            cwd=repo.git_dir,
+            check=True,
+        )
+
     def _get_logging_as_string(self, output):
         messages = [f.getMessage() for f in output.records]
         return '\n'.join(messages)
@@ -126,6 +160,71 @@ class TestUtils(unittest.TestCase):
         # output is shown on info level
         self.assertEqual(output.records[0].levelname, 'DEBUG')
 
+    def test_is_branch_synced_no_fetch(self):
+        """Check that without fetching only the already known refs are used"""
+        # add a remote commit
+        self._commit(self.remote_repo, msg='Second commit')
+        self.remote_repo.remote().push()
+
+        self.assertTrue(is_branch_synced(self.user_repo, fetch=False))
+        self.assertFalse(is_branch_synced(self.user_repo))
+
+    def test_iter_concurrently(self):
+        """Check that results keep the order of the items"""
+        second_done = threading.Event()
+
+        def work(item):
+            # the first item only finishes once the second one is done
+            if item == 'first':
+                self.assertTrue(second_done.wait(timeout=5))
+            else:
+                second_done.set()
+            return item.upper()
+
+        results = iter_concurrently(work, ['first', 'second', 'third'], jobs=3)
+        self.assertEqual(
+            list(results),
+            [('first', 'FIRST'), ('second', 'SECOND'), ('third', 'THIRD')],
+        )
+
+    def test_iter_concurrently_error(self):
+        """Check that errors are raised to the caller"""
+
+        def work(item):
+            raise ValueError(item)
+
+        with self.assertRaises(ValueError):
+            list(iter_concurrently(work, ['one', 'two']))
+
+    def test_prefetch(self):
+        """Check that results keep the order of the items but are computed
+        ahead of time
+        """
+        all_called = threading.Event()
+        called = []
+
+        def work(item):
+            called.append(item)
+            if len(called) == 3:
+                all_called.set()
+            return item * 2
+
+        results = prefetch(work, (i for i in range(3)), jobs=1)
+        self.assertEqual(next(results), (0, 0))
+        # while the first result is being used, the rest are computed
+        self.assertTrue(all_called.wait(timeout=5))
+        self.assertEqual(list(results), [(1, 2), (2, 4)])
+
+    def test_prefetch_error_on_items(self):
+        """Check that errors while getting the items reach the caller"""
+
+        def items():
+            yield 1
+            raise SystemExit
+
+        with self.assertRaises(SystemExit):
+            list(prefetch(lambda item: item, items()))
+
     def test_get_compact_git_history(self):
         """Check that the history is retrieved properly"""
         self._commit(self.user_repo, msg='Second commit')
@@ -148,6 +247,166 @@ class TestUtils(unittest.TestCase):
         self.assertIn('Second commit', git_history)
         self.assertNotIn('First commit', git_history)
 
+    def test_get_second_oldest_commit(self):
+        """Check that the commit found is the same one iter_commits finds"""
+        repo = Repo.init(mkdtemp(), bare=True)
+        self._fast_import(repo, 5000)
+
+        commits = [c for c in repo.iter_commits('main')]
+        self.assertEqual(len(commits), 5000)
+        self.assertEqual(
+            get_second_oldest_commit(repo, 'main'),
+            commits[-2].hexsha,
+        )
+        shutil.rmtree(repo.working_dir)
+
+    def test_get_second_oldest_commit_single_commit(self):
+        """Check that a repository with a single commit is reported"""
+        with self.assertRaises(IndexError):
+            get_second_oldest_commit(self.user_repo)
+
+    def test_get_latest_tag_no_tags(self):
+        """Check that without tags the second oldest commit is returned"""
+        for i in range(1, 4):
+            self._commit(self.user_repo, msg=f'Commit {i}')
+        self.user_repo.remote().push()
+        commits = [c for c in self.user_repo.iter_commits()]
+
+        self.assertEqual(
+            get_latest_tag(self.user_repo, 'main'),
+            commits[-2].hexsha,
+        )
+
+    def test_get_refs_snapshot(self):
+        """Check that branches, remote branches and peeled tags are read"""
+        first = self.user_repo.head.commit.hexsha
+        self.user_repo.create_tag('1.0')
+        self._commit(self.user_repo)
+        self.user_repo.create_tag('2.0', message='Annotated')
+        second = self.user_repo.head.commit.hexsha
+
+        snapshot = get_refs_snapshot(self.user_repo)
+        self.assertEqual(snapshot['heads'], {'main': second})
+        self.assertEqual(snapshot['remotes']['origin/main'], first)
+        self.assertEqual(snapshot['tags'], {'1.0': first, '2.0': second})
+
+    def test_get_latest_tag_on_branch(self):
+        """Check that a tag on the branch itself does not need git describe"""
+        self.user_repo.create_tag('1.0', message='Annotated')
+        with mock.patch.object(
+            Git, 'execute', autospec=True, side_effect=Git.execute
+        ) as execute:
+            self.assertEqual(get_latest_tag(self.user_repo, 'main'), '1.0')
+        commands = [call.args[1][1] for call in execute.call_args_list]
+        self.assertEqual(commands, ['for-each-ref'])
+
+    def test_get_latest_tag_behind_branch(self):
+        """Check that the closest tag is found if the branch is ahead of it"""
+        self.user_repo.create_tag('1.0')
+        self.user_repo.create_tag('1.1')
+        self._commit(self.user_repo)
+        self.user_repo.remote().push()
+
+        self.assertIn(get_latest_tag(self.user_repo, 'main'), ('1.0', '1.1'))
+
+    def test_get_latest_tag_missing_branch(self):
+        """Check that a branch that is not on the remote is reported"""
+        with self.assertRaises(IndexError):
+            get_latest_tag(self.user_repo, 'non-existing')
+
+    def test_get_refs_fingerprint(self):
+        """Check that the fingerprint changes along with branches and tags"""
+        fingerprint = get_refs_fingerprint(self.user_repo, 'main')
+        self.assertEqual(
+            fingerprint['branch_sha'],
+            self.user_repo.remote().refs['main'].commit.hexsha,
+        )
+        self.assertEqual(fingerprint['local_sha'], self.user_repo.head.commit.hexsha)
+
+        self.user_repo.create_tag('1.0')
+        with_tag = get_refs_fingerprint(self.user_repo, 'main')
+        self.assertNotEqual(fingerprint['tags'], with_tag['tags'])
+
+        # packing the refs does not change anything
+        self.user_repo.git.pack_refs('--all')
+        self.assertEqual(get_refs_fingerprint(self.user_repo, 'main'), with_tag)
+
+        self._commit(self.user_repo)
+        self.assertNotEqual(
+            get_refs_fingerprint(self.user_repo, 'main')['local_sha'],
+            with_tag['local_sha'],
+        )
+
+    def test_get_refs_fingerprint_missing_branch(self):
+        """Check that branches that do not exist are reported as None"""
+        fingerprint = get_refs_fingerprint(self.user_repo, 'non-existing')
+        self.assertIsNone(fingerprint['branch_sha'])
+        self.assertIsNone(fingerprint['local_sha'])
+
+    def test_iter_compact_git_history(self):
+        """Check that the streamed history is the same as the compact one"""
+        self._commit(self.user_repo, msg='Second commit')
+        self.user_repo.create_tag('my-tag')
+        self._commit(self.user_repo, msg='Third commit')
+
+        self.assertEqual(
+            '\n'.join(iter_compact_git_history(self.user_repo, 'my-tag', 'main')),
+            get_compact_git_history(self.user_repo, 'my-tag', 'main'),
+        )
+        self.assertEqual(
+            list(iter_compact_git_history(self.user_repo, 'non-existing', 'main')),
+            [],
+        )
+
+    def test_filter_git_history(self):
+        """Check that administrative commits are removed"""
+        history = '\n'.join(
+            [
+                '* 1234 Fix the thing',
+                '* 2345 Back to development: 1.1',
+                '* 3456 Preparing release 1.0',
+                '* 4567 Add a feature',
+            ]
+        )
+        self.assertEqual(
+            filter_git_history(history),
+            '* 1234 Fix the thing\n* 4567 Add a feature',
+        )
+
+    def test_filter_git_history_literal_patterns(self):
+        """Check that patterns are not treated as regular expressions"""
+        commit_filter = compile_commit_filter(('[ci skip]', 'a.b'))
+        lines = ['* 1 [ci skip] lala', '* 2 i', '* 3 axb', '* 4 a.b']
+        self.assertEqual(
+            list(iter_filtered_git_history(lines, commit_filter)),
+            ['* 2 i', '* 3 axb'],
+        )
+
+    def test_filter_git_history_no_patterns(self):
+        """Check that without patterns nothing is filtered"""
+        commit_filter = compile_commit_filter(())
+        self.assertEqual(
+            filter_git_history('* 1 Bump version', commit_filter),
+            '* 1 Bump version',
+        )
+
+    def test_get_ignore_commit_messages(self):
+        """Check that more commit messages can be ignored on release.cfg"""
+        config_file = os.path.join(self.user_repo.working_tree_dir, 'release.cfg')
+        with open(config_file, 'w') as a_file:
+            a_file.write(
+                '[history]\nignore-commit-messages =\n    [ci skip]\n    WIP\n'
+            )
+
+        patterns = get_ignore_commit_messages(config_file)
+        self.assertIn('Bump version', patterns)
+        self.assertEqual(patterns[-2:], ('[ci skip]', 'WIP'))
+
+    def test_get_ignore_commit_messages_no_config(self):
+        """Check that without configuration the defaults are used"""
+        patterns = get_ignore_commit_messages('/non/existing/release.cfg')
+        self.assertIn('Bump version', patterns)
+
     def test_git_repo_context_manager_shallow(self):
         """Check that the context manager returns a shallow clone"""
         # make some commits
@@ -175,6 +434,98 @@ class TestUtils(unittest.TestCase):
             commits = [c for c in repo.iter_commits()]
             self.assertEqual(len(commits), total_commits)
 
+    def test_git_repo_mirror(self):
+        """Check that the clone is made out of an up to date mirror"""
+        mirrors = mkdtemp()
+        self.addCleanup(shutil.rmtree, mirrors)
+
+        with git_repo(self.source, shallow=False, mirrors_folder=mirrors) as repo:
+            self.assertEqual(repo.remote().url, self.source.url)
+        self.assertEqual(len(os.listdir(mirrors)), 1)
+
+        self._commit(self.user_repo, msg='New commit')
+        self.user_repo.remote().push()
+
+        with git_repo(self.source, shallow=False, mirrors_folder=mirrors) as repo:
+            repo.git.checkout('main')
+            self.assertEqual(repo.head.commit.message, 'New commit')
+            self.assertEqual(repo.remote().url, self.source.url)
+        self.assertEqual(len(os.listdir(mirrors)), 1)
+
+    def test_update_mirror_interrupted(self):
+        """Check that an interrupted first clone is not used as the mirror"""
+        mirrors = mkdtemp()
+        self.addCleanup(shutil.rmtree, mirrors)
+
+        def interrupted_clone(url, path, **kwargs):
+            open(os.path.join(path, 'HEAD'), 'w').close()
+            raise GitCommandError('clone', 128)
+
+        with mock.patch.object(Repo, 'clone_from', side_effect=interrupted_clone):
+            with self.assertRaises(GitCommandError):
+                update_mirror(self.source.url, mirrors)
+        self.assertEqual(os.listdir(mirrors), [])
+
+        path = update_mirror(self.source.url, mirrors)
+        self.assertEqual(os.listdir(mirrors), [os.path.basename(path)])
+        self.assertEqual(
+            Repo(path).heads['main'].commit.hexsha,
+            self.remote_repo.head.commit.hexsha,
+        )
+
+    def test_git_repo_mirror_shallow(self):
+        """Check that a shallow clone out of a mirror is still shallow"""
+        for i in range(1, 5):
+            self._commit(self.user_repo, msg=f'Commit {i}')
+        self.user_repo.remote().push()
+        mirrors = mkdtemp()
+        self.addCleanup(shutil.rmtree, mirrors)
+
+        with git_repo(self.source, depth=2, mirrors_folder=mirrors) as repo:
+            commits = [c for c in repo.iter_commits()]
+            self.assertEqual(len(commits), 2)
+            self.assertEqual(repo.remote().url, self.source.url)
+
+    def test_git_repo_sparse(self):
+        """Check that only the requested paths are checked out"""
+        os.makedirs(f'{self.user_repo.working_tree_dir}/folder')
+        for filename in ('folder/one', 'two'):
+            open(f'{self.user_repo.working_tree_dir}/{filename}', 'w').close()
+        self.user_repo.index.add(['folder/one', 'two'])
+        self.user_repo.index.commit('Add files')
+        self.user_repo.remote().push()
+
+        with git_repo(self.source, sparse_paths=['folder/one']) as repo:
+            self.assertEqual(
+                sorted(os.listdir(repo.working_tree_dir)), ['.git', 'folder']
+            )
+            self.assertEqual(len(repo.branches), 1)
+
+            with open(f'{repo.working_tree_dir}/folder/one', 'w') as a_file:
+                a_file.write('changed')
+            repo.git.add('folder/one')
+            repo.git.commit('-m', 'Sparse commit')
+            repo.remote().push()
+
+        self.user_repo.remote().pull()
+        self.assertEqual(self.user_repo.head.commit.message, 'Sparse commit\n')
+        self.assertTrue(os.path.exists(f'{self.user_repo.working_tree_dir}/two'))
+
+    def test_git_repo_sparse_mirror(self):
+        """Check that a sparse checkout can be made out of a mirror"""
+        mirrors = mkdtemp()
+        self.addCleanup(shutil.rmtree, mirrors)
+        open(f'{self.user_repo.working_tree_dir}/two', 'w').close()
+        self.user_repo.index.add(['two'])
+        self.user_repo.index.commit('Add file')
+        self.user_repo.remote().push()
+
+        with git_repo(
+            self.source, mirrors_folder=mirrors, sparse_paths=['two']
+        ) as repo:
+            self.assertEqual(sorted(os.listdir(repo.working_tree_dir)), ['.git', 'two'])
+            self.assertEqual(repo.remote().url, self.source.url)
+
     def test_wrap_folder_context_manager(self):
         """Check that wrap_folder context manager changes the current folder"""
         current_dir = os.getcwd()
@@ -185,6 +536,16 @@ class TestUtils(unittest.TestCase):
 
         self.assertEqual(os.getcwd(), current_dir)
 
+    def test_wrap_folder_context_manager_error(self):
+        """Check that the folder is restored even if there is an error"""
+        current_dir = os.getcwd()
+
+        with self.assertRaises(ValueError):
+            with wrap_folder(self.user_repo.working_tree_dir):
+                raise ValueError
+
+        self.assertEqual(os.getcwd(), current_dir)
+
     def test_wrap_sys_argv_context_manager(self):
         """Check that wrap_sys_argv context manager saves and restores
         sys.argv
@@ -0,0 +1,92 @@
+from freitag.releaser.versions import set_versions
+from freitag.releaser.versions import VersionPins
+from tempfile import mkdtemp
+
+import os
+import shutil
+import stat
+import unittest
+
+
+VERSIONS = """[buildout]
+extends = base.cfg
+
+[versions]
+# our own distributions
+der.freitag = 1.0
+Freitag.Article = 2.0
+# keep it below 3
+other = 2.5
+
+[versions:python312]
+der.freitag = 0.9
+"""
+
+
+class TestVersionPins(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+        self.path = os.path.join(self.folder, 'versions.cfg')
+        with open(self.path, 'w') as versions_file:
+            versions_file.write(VERSIONS)
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _read(self):
+        with open(self.path) as versions_file:
+            return versions_file.read()
+
+    def test_update_keeps_layout(self):
+        """Check that comments, order and other sections are kept"""
+        changed = set_versions(
+            self.path, {'der.freitag': '1.1', 'freitag.article': '2.1'}
+        )
+        self.assertEqual(changed, ['der.freitag', 'freitag.article'])
+        self.assertEqual(
+            self._read(),
+            VERSIONS.replace('der.freitag = 1.0', 'der.freitag = 1.1').replace(
+                'Freitag.Article = 2.0', 'freitag.article = 2.1'
+            ),
+        )
+
+    def test_new_pins(self):
+        """Check that new pins are added at the end of the section"""
+        set_versions(self.path, {'new.one': '0.1'})
+        self.assertIn(
+            'other = 2.5\nnew.one = 0.1\n\n[versions:python312]', self._read()
+        )
+
+    def test_no_section(self):
+        """Check that the section is created if it does not exist"""
+        with open(self.path, 'w') as versions_file:
+            versions_file.write('[buildout]\nextends = base.cfg\n')
+        set_versions(self.path, {'new.one': '0.1'})
+        self.assertEqual(
+            self._read(),
+            '[buildout]\nextends = base.cfg\n\n[versions]\nnew.one = 0.1\n',
+        )
+
+    def test_duplicates_are_removed(self):
+        """Check that only one pin is kept for a distribution"""
+        with open(self.path, 'a') as versions_file:
+            versions_file.write('[versions]\nother = 1.0\n')
+        set_versions(self.path, {'other': '3.0'})
+        data = self._read()
+        self.assertIn('other = 3.0', data)
+        self.assertNotIn('other = 1.0', data)
+
+    def test_no_changes_no_write(self):
+        """Check that the file is not written if nothing changed"""
+        os.utime(self.path, (0, 0))
+        self.assertEqual(set_versions(self.path, {'other': '2.5'}), [])
+        self.assertEqual(os.stat(self.path).st_mtime, 0)
+
+    def test_save_keeps_mode(self):
+        """Check that the file replaced keeps its permissions"""
+        os.chmod(self.path, 0o640)
+        pins = VersionPins(self.path)
+        pins.update({'other': '2.6'})
+        pins.save()
+        self.assertEqual(stat.S_IMODE(os.stat(self.path).st_mode), 0o640)
+        self.assertEqual(os.listdir(self.folder), ['versions.cfg'])
@@ -0,0 +1,194 @@
+from freitag.releaser.worker import ReleaseWorker
+from git import Repo
+from io import StringIO
+from tempfile import mkdtemp
+from unittest import mock
+
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import time
+import unittest
+
+
+SETUP_PY = """from setuptools import setup
+
+version = '1.0.1.dev0'
+
+setup(name='my.distribution', version=version)
+"""
+
+CHANGES = """Changelog
+=========
+
+1.0.1 (unreleased)
+------------------
+
+- Change
+"""
+
+
+class RecordingOutput(StringIO):
+    """Keep each write on its own"""
+
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, text):
+        self.writes.append(text)
+        return super().write(text)
+
+
+class TestReleaseWorker(unittest.TestCase):
+    def setUp(self):
+        self.folder = mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.folder)
+
+    def _stream(self, *chunks):
+        output = StringIO()
+        worker = ReleaseWorker(self.folder, name='my.distribution', output=output)
+        read_end, write_end = os.pipe()
+        for chunk in chunks:
+            os.write(write_end, chunk)
+        os.close(write_end)
+        with open(read_end, 'rb') as pipe:
+            worker._stream(pipe)
+        return output.getvalue()
+
+    def test_stream_prefixes_lines(self):
+        """Check that every line of output is prefixed"""
+        self.assertEqual(
+            self._stream(b'one\ntwo\n\nthree'),
+            '[my.distribution] one\n[my.distribution] two\n\n'
+            '[my.distribution] three',
+        )
+
+    def test_stream_split_multibyte(self):
+        """Check that characters split across reads are kept"""
+        data = 'Grüße\n'.encode()
+        with mock.patch(
+            'freitag.releaser.worker.os.read',
+            side_effect=[data[:3], data[3:], b''],
+        ):
+            self.assertEqual(self._stream(), '[my.distribution] Grüße\n')
+
+    def test_stream_whole_lines(self):
+        """Check that lines split across reads are written at once"""
+        output = RecordingOutput()
+        worker = ReleaseWorker(self.folder, name='my.distribution', output=output)
+        read_end, write_end = os.pipe()
+        os.close(write_end)
+        with (
+            open(read_end, 'rb') as pipe,
+            mock.patch(
+                'freitag.releaser.worker.os.read',
+                side_effect=[b'one\ntw', b'o\nthr', b'ee\n', b''],
+            ),
+        ):
+            worker._stream(pipe)
+
+        self.assertEqual(
+            [text for text in output.writes if text],
+            [
+                '[my.distribution] one\n',
+                '[my.distribution] two\n',
+                '[my.distribution] three\n',
+            ],
+        )
+
+    def test_stream_question(self):
+        """Check that a line that does not end is shown if nothing follows"""
+        output = StringIO()
+        worker = ReleaseWorker(self.folder, name='my.distribution', output=output)
+        read_end, write_end = os.pipe()
+        os.write(write_end, b'Continue? ')
+        pipe = open(read_end, 'rb')
+        thread = threading.Thread(target=worker._stream, args=(pipe,))
+        thread.start()
+        try:
+            for _ in range(50):
+                if output.getvalue():
+                    break
+                time.sleep(0.1)
+            self.assertEqual(output.getvalue(), '[my.distribution] Continue? ')
+        finally:
+            os.write(write_end, b'yes\n')
+            os.close(write_end)
+            thread.join(timeout=5)
+
+        self.assertEqual(output.getvalue(), '[my.distribution] Continue? yes\n')
+
+    def test_default_name(self):
+        """Check that the folder name is used as prefix by default"""
+        worker = ReleaseWorker(f'{self.folder}/my.distribution/')
+        self.assertEqual(worker.prefix, '[my.distribution] ')
+
+    def test_unknown_command(self):
+        """Check that only zest.releaser commands can be run"""
+        worker = ReleaseWorker(self.folder)
+        with self.assertRaises(ValueError):
+            worker.run('rm')
+
+    def test_failing_command(self):
+        """Check that a failing command raises an error"""
+        output = StringIO()
+        worker = ReleaseWorker(self.folder, output=output)
+        with self.assertRaises(subprocess.CalledProcessError):
+            worker.run('fullrelease', '--no-input')
+        self.assertIn(worker.prefix, output.getvalue())
+
+    def _distribution(self):
+        repo = Repo.init(self.folder)
+        for filename, contents in (('setup.py', SETUP_PY), ('CHANGES.rst', CHANGES)):
+            with open(os.path.join(self.folder, filename), 'w') as file_obj:
+                file_obj.write(contents)
+        repo.index.add(['setup.py', 'CHANGES.rst'])
+        repo.index.commit('Initial commit')
+        repo.create_tag('1.0')
+        self.addCleanup(repo.close)
+        return repo
+
+    def test_run_bumpversion(self):
+        """Check that the new version is reported back"""
+        repo = self._distribution()
+
+        output = StringIO()
+        worker = ReleaseWorker(self.folder, output=output)
+        result = worker.run('bumpversion', '--feature', '--no-input')
+
+        self.assertEqual(result, {'version': '1.1.0.dev0'})
+        self.assertIn(
+            '1.1.0 (unreleased)',
+            repo.head.commit.tree['CHANGES.rst'].data_stream.read().decode(),
+        )
+        self.assertIn(f'{worker.prefix}Checking version bump', output.getvalue())
+
+    def test_run_sys_path(self):
+        """Check that the worker sees what is on sys.path, like the hooks
+        installed by buildout
+        """
+        self._distribution()
+        eggs = mkdtemp()
+        self.addCleanup(shutil.rmtree, eggs)
+        os.makedirs(os.path.join(eggs, 'probe-1.0.dist-info'))
+        with open(os.path.join(eggs, 'probe-1.0.dist-info', 'METADATA'), 'w') as meta:
+            meta.write('Metadata-Version: 2.1\nName: probe\nVersion: 1.0\n')
+        entry_points = os.path.join(eggs, 'probe-1.0.dist-info', 'entry_points.txt')
+        with open(entry_points, 'w') as entry_points_file:
+            entry_points_file.write(
+                '[zest.releaser.bumpversion.before]\nprobe = probe_hook:hook\n'
+            )
+        with open(os.path.join(eggs, 'probe_hook.py'), 'w') as hook:
+            hook.write('def hook(data):\n    print("probe hook called")\n')
+
+        output = StringIO()
+        worker = ReleaseWorker(self.folder, output=output)
+        with mock.patch.object(sys, 'path', [eggs, *sys.path]):
+            worker.run('bumpversion', '--feature', '--no-input')
+
+        self.assertIn(f'{worker.prefix}probe hook called', output.getvalue())
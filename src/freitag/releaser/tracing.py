@@ -0,0 +1,93 @@
+from contextlib import contextmanager
+from contextlib import nullcontext
+
+import json
+import os
+import threading
+import time
+
+
+class Tracer:
+    """Collect timed spans of what happens during a run
+
+    Spans can be nested and come from any thread, they are written in the
+    Chrome trace event format, which can be opened with chrome://tracing or
+    https://ui.perfetto.dev
+
+    A disabled tracer does not record anything and adds almost no overhead.
+
+    :param enabled: whether spans are recorded
+    :type enabled: bool
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+        self._start = time.perf_counter()
+        self._threads = {}
+        self._lock = threading.Lock()
+
+    def _now(self):
+        # microseconds, as the trace event format expects
+        return (time.perf_counter() - self._start) * 1e6
+
+    def span(self, name, category='release', **args):
+        """Time what happens within the context manager
+
+        :param name: what is being done
+        :type name: str
+        :param category: kind of span (e.g. phase, git, network)
+        :type category: str
+        :param args: extra information shown together with the span (e.g.
+          which distribution it is about)
+        :return: a context manager
+        """
+        if not self.enabled:
+            return nullcontext()
+        return self._span(name, category, args)
+
+    @contextmanager
+    def _span(self, name, category, args):
+        thread = threading.current_thread()
+        start = self._now()
+        try:
+            yield
+        finally:
+            event = {
+                'name': name,
+                'cat': category,
+                'ph': 'X',
+                'ts': round(start, 1),
+                'dur': round(self._now() - start, 1),
+                'pid': os.getpid(),
+                'tid': thread.ident,
+                'args': args,
+            }
+            with self._lock:
+                self.events.append(event)
+                self._threads[thread.ident] = thread.name
+
+    def write(self, path):
+        """Write all recorded spans as a Chrome trace event file
+
+        :param path: where to write the trace
+        :type path: str
+        """
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [
+            {
+                'name': 'thread_name',
+                'ph': 'M',
+                'pid': os.getpid(),
+                'tid': ident,
+                'args': {'name': name},
+            }
+            for ident, name in threads.items()
+        ]
+        with open(path, 'w') as trace_file:
+            json.dump(
+                {'traceEvents': metadata + events, 'displayTimeUnit': 'ms'},
+                trace_file,
+            )
@@ -1,40 +1,60 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
 from freitag.releaser import IGNORE_COMMIT_MESSAGES
+from freitag.releaser.common import cache_folder
+from freitag.releaser.common import configure_logging  # noqa: F401
+from freitag.releaser.common import get_servers  # noqa: F401
+from freitag.releaser.common import iter_concurrently  # noqa: F401
+from freitag.releaser.common import read_config
+from freitag.releaser.publisher import push_cfg_files  # noqa: F401
+from functools import lru_cache
 from git import Repo
 from git.exc import GitCommandError
 from shutil import rmtree
 from tempfile import mkdtemp
 
-import configparser
+import hashlib
 import logging
 import os
-import subprocess
+import queue
+import re
 import sys
+import threading
 
 
 logger = logging.getLogger(__name__)
 
 
-def configure_logging(debug):
-    if debug:
-        level = logging.DEBUG
+def fetch_remote(repo, session=None):
+    """Fetch the default remote of the given repository
+
+    :param repo: the repository that will be fetched
+    :type repo: git.Repo
+    :param session: if given, the repository is only fetched if it was not
+      fetched already during the session
+    :type session: freitag.releaser.session.RepoSession
+    """
+    if session is None:
+        repo.remote().fetch()
     else:
-        level = logging.INFO
-    logging.basicConfig(level=level, format='%(message)s')
+        session.fetch(repo)
 
 
-def update_branch(repo, branch):
+def update_branch(repo, branch, session=None):
     """Update the given branch on the given repository
 
     :param  repo: git repository where the branch should exist
     :type repo: git.Repo
     :param branch: branch that will be updated
     :type branch: str
+    :param session: session that keeps track of already fetched repositories
+    :type session: freitag.releaser.session.RepoSession
     :return: whether updating the branch was successful or not
     :rtype: bool
     """
     remote = repo.remote()
-    remote.fetch()
+    fetch_remote(repo, session=session)
     try:
         repo.heads[branch].checkout()
     except IndexError:
@@ -49,19 +69,79 @@ def update_branch(repo, branch):
     return True
 
 
-def is_branch_synced(repo, branch='main'):
+def prefetch(function, items, jobs=8):
+    """Call the given function with each item ahead of time
+
+    Items are taken from a background thread as soon as they are available,
+    and the function is called with them on background workers, while the
+    results are yielded in the same order as the items come.
+
+    This way, while the caller is busy with one result (e.g. waiting for an
+    answer from the user), the next ones are already being computed.
+
+    :param function: what to call with each item
+    :type function: callable
+    :param items: the items to call the function with
+    :type items: iterable
+    :param jobs: how many calls can run at the same time
+    :type jobs: int
+    :return: pairs of item and the result of calling the function with it
+    :rtype: generator
+    :raises: whatever the function, or iterating over items, raises
+    """
+    executor = ThreadPoolExecutor(max_workers=max(jobs, 1))
+    pending = queue.Queue()
+    done = object()
+    stop = threading.Event()
+    errors = []
+
+    def feed():
+        try:
+            for item in items:
+                if stop.is_set():
+                    break
+                pending.put((item, executor.submit(function, item)))
+        except BaseException as error:  # noqa: B902
+            # hand over everything, even SystemExit, to the caller thread
+            errors.append(error)
+        finally:
+            pending.put(done)
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+    try:
+        while True:
+            entry = pending.get()
+            if errors:
+                raise errors[0]
+            if entry is done:
+                break
+            item, future = entry
+            yield item, future.result()
+    finally:
+        stop.set()
+        executor.shutdown(cancel_futures=True)
+
+
+def is_branch_synced(repo, branch='main', fetch=True, session=None):
     """Check if given branch on the given repository has local commits
 
     :param repo: the repository that will be used to check the branches
     :type repo: git.Repo
     :param branch: the branch that needs to be checked if it is synced
     :type branch: str
+    :param fetch: whether the remote has to be fetched before checking,
+      set it to False if the repository has been fetched already
+    :type fetch: bool
+    :param session: session that keeps track of already fetched repositories
+    :type session: freitag.releaser.session.RepoSession
     :return: whether the given repo's branch is in sync with upstream
     :rtype: bool
     """
-    # get new code, if any
     remote = repo.remote()
-    remote.fetch()
+    if fetch:
+        # get new code, if any
+        fetch_remote(repo, session=session)
 
     try:
         local_branch = repo.refs[branch]
@@ -87,6 +167,32 @@ def is_branch_synced(repo, branch='main'):
     return True
 
 
+def iter_compact_git_history(repo, tag, base_branch):
+    """Streams the commits between the given tag and branch line by line
+
+    Same as get_compact_git_history, but without holding the whole history
+    in memory.
+
+    :param repo: the repository that will be used to get the history
+    :type repo: git.Repo
+    :param tag: the tag that will be used as a base from where to get commits
+    :type tag: str
+    :param base_branch: the branch up to where commits are gathered
+    :type base_branch: str
+    :return: each line of the history
+    :rtype: generator of str
+    """
+    process = repo.git.log(
+        '--oneline', '--graph', f'{tag}~1..{base_branch}', as_process=True
+    )
+    for line in process.stdout:
+        yield line.decode().rstrip('\n')
+    try:
+        process.wait()
+    except GitCommandError:
+        return
+
+
 def get_compact_git_history(repo, tag, base_branch):
     """Gets all the commits between the given tag and branch
 
@@ -105,76 +211,326 @@ def get_compact_git_history(repo, tag, base_branch):
         return ''
 
 
-def push_cfg_files():
-    files = [
-        'versions.cfg',
-        'release.cfg',
-        'sources.cfg',
-        'qa.cfg',
-    ]
-    user, server, path = get_servers('eggs')[0]
+@lru_cache
+def compile_commit_filter(patterns=IGNORE_COMMIT_MESSAGES):
+    """Compiles the given commit messages into a single regular expression
 
-    command = ['scp']
-    command.extend(files)
-    command.append(f'{user}@{server}:{path}')
-    process = subprocess.Popen(command, stdout=subprocess.PIPE)
-    stdout, stderr = process.communicate()
-    print(stdout)  # noqa: T201
+    :param patterns: commit messages (or parts of it) that are not worth
+      showing, they are matched literally
+    :type patterns: tuple
+    :return: an expression that matches lines with any of the patterns
+    :rtype: re.Pattern
+    """
+    if not patterns:
+        # an expression that never matches
+        return re.compile('(?!)')
+    return re.compile('|'.join(re.escape(pattern) for pattern in patterns))
+
+
+def get_ignore_commit_messages(config_file='release.cfg'):
+    """Get the commit messages that are not worth showing
+
+    On top of the IGNORE_COMMIT_MESSAGES defaults, more can be added on
+    release.cfg, one per line::
+
+        [history]
+        ignore-commit-messages =
+            [ci skip]
+            Update translations
+
+    :param config_file: path to the configuration file
+    :type config_file: str
+    :rtype: tuple
+    """
+    try:
+        config = read_config(config_file)
+    except OSError:
+        return IGNORE_COMMIT_MESSAGES
+    extra = config.get('history', 'ignore-commit-messages', fallback='')
+    lines = [line.strip() for line in extra.strip().split('\n')]
+    return IGNORE_COMMIT_MESSAGES + tuple(line for line in lines if line)
+
+
+def iter_filtered_git_history(lines, commit_filter=None):
+    """Removes administrative/boilerplate commits from the given git history.
+
+    Lines are filtered one by one as they come.
+
+    :param lines: the git changes that need to be filtered
+    :type lines: iterable of str
+    :param commit_filter: what to filter, see compile_commit_filter,
+      defaults to IGNORE_COMMIT_MESSAGES
+    :type commit_filter: re.Pattern
+    :return: the lines without any uninteresting commit message
+    :rtype: generator of str
+    """
+    if commit_filter is None:
+        commit_filter = compile_commit_filter()
+
+    search = commit_filter.search
+    for line in lines:
+        if not search(line):
+            yield line
 
 
-def filter_git_history(changes):
+def filter_git_history(changes, commit_filter=None):
     """Removes administrative/boilerplate commits from the given git history.
 
+    Rather than checking each line, the whole history is searched at once,
+    and only the lines where something is found are removed.
+
     :param changes: the git changes that need to be filtered
     :type changes: str
+    :param commit_filter: what to filter, see compile_commit_filter,
+      defaults to IGNORE_COMMIT_MESSAGES
+    :type commit_filter: re.Pattern
     :return: the original git changes without any uninteresting commit message
     :rtype: str
     """
-    cleaned_changes = []
-    for line in changes.split('\n'):
-        found = False
-        for ignore_message in IGNORE_COMMIT_MESSAGES:
-            if line.find(ignore_message) != -1:
-                found = True
+    if commit_filter is None:
+        commit_filter = compile_commit_filter()
+
+    kept = []
+    # start of the first line that has not been handled yet
+    position = 0
+    for match in commit_filter.finditer(changes):
+        line_start = changes.rfind('\n', 0, match.start()) + 1
+        if line_start < position:
+            # the line has already been removed
+            continue
+        if line_start > position:
+            kept.append(changes[position : line_start - 1])
+        line_end = changes.find('\n', match.end())
+        if line_end == -1:
+            # it was the last line
+            position = len(changes) + 1
+        else:
+            position = line_end + 1
+
+    if position <= len(changes):
+        kept.append(changes[position:])
+
+    return '\n'.join(kept)
+
+
+def get_refs_snapshot(repo):
+    """Read all branches, remote branches and tags of the given repository
+
+    A single git for-each-ref call is run, rather than creating a GitPython
+    reference (and reading its commit) for each of them.
+
+    :param repo: the repository where to look for the refs
+    :type repo: git.Repo
+    :return: the commit hexsha of each local branch ('heads', keyed by the
+      branch name), remote branch ('remotes', keyed by remote/branch) and tag
+      ('tags', keyed by the tag name, annotated tags are peeled to the commit
+      they point to)
+    :rtype: dict
+    """
+    snapshot = {'heads': {}, 'remotes': {}, 'tags': {}}
+    prefixes = (
+        ('refs/heads/', snapshot['heads']),
+        ('refs/remotes/', snapshot['remotes']),
+        ('refs/tags/', snapshot['tags']),
+    )
+    output = repo.git.for_each_ref(
+        '--format=%(refname) %(objectname) %(*objectname)',
+        'refs/heads',
+        'refs/remotes',
+        'refs/tags',
+    )
+    for line in output.splitlines():
+        name, sha, *peeled = line.split()
+        for prefix, refs in prefixes:
+            if name.startswith(prefix):
+                refs[name[len(prefix) :]] = peeled[0] if peeled else sha
                 break
-        if not found:
-            cleaned_changes.append(line)
+    return snapshot
 
-    return '\n'.join(cleaned_changes)
 
-
-def get_latest_tag(repo, branch):
+def get_latest_tag(repo, branch, snapshot=None):
     """Returns the tag closest to the given branch on the given repository.
 
     If no tag can be found,
     then the earliest possible commit is returned instead.
 
+    If a single tag points to the branch itself, no git command is run.
+
     :param repo: the repository where to look for the tag
     :type repo: git.Repo
     :param branch: the branch where to look for a tag
     :type branch: str
+    :param snapshot: the refs of the repository, see get_refs_snapshot,
+      they are read if not given
+    :type snapshot: dict
     :return: closest reachable tag from given branch,
       or the earliest commit possible
     :rtype: str
     :raises: IndexError if the given branch can not be found on the
       default git remote
     """
-    remote = repo.remote()
-    latest_branch_commit = remote.refs[branch].commit.hexsha
+    if snapshot is None:
+        snapshot = get_refs_snapshot(repo)
+    remote_branch = f'{repo.remote().name}/{branch}'
+    try:
+        latest_branch_commit = snapshot['remotes'][remote_branch]
+    except KeyError:
+        raise IndexError(f'{remote_branch} does not exist') from None
+
+    tags = [
+        name for name, sha in snapshot['tags'].items() if sha == latest_branch_commit
+    ]
+    if len(tags) == 1:
+        return tags[0]
+
+    # either there are no tags on the branch itself, or there are many
+    # and git describe knows which one to pick
     try:
         latest_tag = repo.git.describe('--abbrev=0', '--tags', latest_branch_commit)
     except GitCommandError:
         # get the second to last commit
         # for the way get_compact_git_history gets the commit before
         # the earliest you pass
-        commits = [c for c in repo.iter_commits()]
-        latest_tag = commits[-2].hexsha
+        latest_tag = get_second_oldest_commit(repo)
 
     return latest_tag
 
 
+def _read_packed_refs(repo):
+    """Parse the packed-refs file of the given repository"""
+    refs = {}
+    try:
+        with open(os.path.join(repo.common_dir, 'packed-refs')) as packed_file:
+            for line in packed_file:
+                if line.startswith(('#', '^')):
+                    continue
+                sha, name = line.split()
+                refs[name] = sha
+    except OSError:
+        pass
+    return refs
+
+
+def _read_loose_ref(repo, name):
+    try:
+        with open(os.path.join(repo.common_dir, name)) as ref_file:
+            return ref_file.read().strip()
+    except OSError:
+        return None
+
+
+def get_refs_fingerprint(repo, branch):
+    """Returns what identifies the state of the given branch and all tags
+
+    Refs are read straight from the git folder, no git command is run,
+    so it is cheap to do it on lots of repositories.
+
+    :param repo: the repository where to look for the refs
+    :type repo: git.Repo
+    :param branch: the branch that is checked, locally and remotely
+    :type branch: str
+    :return: local and remote branch hexsha (or None if they do not exist)
+      and a checksum of all tags and where they point to
+    :rtype: dict
+    """
+    packed_refs = _read_packed_refs(repo)
+
+    def resolve(name):
+        return _read_loose_ref(repo, name) or packed_refs.get(name)
+
+    tags = {
+        name: sha for name, sha in packed_refs.items() if name.startswith('refs/tags/')
+    }
+    tags_folder = os.path.join(repo.common_dir, 'refs', 'tags')
+    for root, _, files in os.walk(tags_folder):
+        for filename in files:
+            path = os.path.join(root, filename)
+            name = os.path.relpath(path, repo.common_dir).replace(os.sep, '/')
+            tags[name] = _read_loose_ref(repo, name)
+
+    tags_checksum = hashlib.sha1()
+    for name in sorted(tags):
+        tags_checksum.update(f'{name} {tags[name]}\n'.encode())
+
+    return {
+        'branch_sha': resolve(f'refs/remotes/{repo.remote().name}/{branch}'),
+        'local_sha': resolve(f'refs/heads/{branch}'),
+        'tags': tags_checksum.hexdigest(),
+    }
+
+
+def get_second_oldest_commit(repo, rev='HEAD'):
+    """Returns the second to last commit that git rev-list reports
+
+    The list of commits is streamed out of git, rather than building
+    git.Commit objects for each of them, so memory usage does not grow with
+    the size of the history.
+
+    :param repo: the repository where to look for the commit
+    :type repo: git.Repo
+    :param rev: where to start looking for commits
+    :type rev: str
+    :return: the hexsha of the second oldest commit
+    :rtype: str
+    :raises: IndexError if there are less than two commits
+    """
+    process = repo.git.rev_list(rev, as_process=True)
+    last_commits = deque(process.stdout, maxlen=2)
+    process.wait()
+    if len(last_commits) < 2:
+        raise IndexError(f'{rev} has less than two commits')
+
+    return last_commits[0].decode().strip()
+
+
+def default_mirrors_folder():
+    """Where the mirrors of the repositories cloned by git_repo are kept
+
+    :rtype: str
+    """
+    return os.path.join(cache_folder(), 'mirrors')
+
+
+def update_mirror(url, mirrors_folder):
+    """Keep a bare mirror of the given repository up to date
+
+    The first time the repository is fully cloned, afterwards only what
+    changed since is fetched. The first clone is made on a temporary folder
+    and only moved in place once it is complete, so that an interrupted
+    clone is never taken as the mirror.
+
+    :param url: the repository to mirror
+    :type url: str
+    :param mirrors_folder: where all mirrors are kept
+    :type mirrors_folder: str
+    :return: path to the mirror
+    :rtype: str
+    """
+    name = url.rstrip('/').split('/')[-1].split(':')[-1] or 'repository'
+    url_hash = hashlib.sha1(url.encode()).hexdigest()[:12]
+    path = os.path.join(mirrors_folder, f'{name}-{url_hash}')
+    if os.path.exists(path):
+        logger.debug(f'Updating mirror of {url} on {path}')
+        Repo(path).git.remote('update', '--prune')
+    else:
+        logger.debug(f'Creating mirror of {url} on {path}')
+        os.makedirs(mirrors_folder, exist_ok=True)
+        tmp_dir = mkdtemp(prefix=f'.{name}-', dir=mirrors_folder)
+        try:
+            Repo.clone_from(url, tmp_dir, mirror=True).close()
+            os.rename(tmp_dir, path)
+        except OSError:
+            # someone else created the mirror meanwhile
+            if not os.path.exists(path):
+                raise
+        finally:
+            if os.path.exists(tmp_dir):
+                rmtree(tmp_dir)
+    return path
+
+
 @contextmanager
-def git_repo(source, shallow=True, depth=100):
+def git_repo(source, shallow=True, depth=100, mirrors_folder=None, sparse_paths=None):
     """Handle temporal git repositories.
 
     It ensures that a git repository is cloned on a temporal folder that is
@@ -189,6 +545,15 @@ def git_repo(source, shallow=True, depth=100):
     :type shallow: bool
     :param depth: how many commits will be fetched
     :type depth: int
+    :param mirrors_folder: if given, a mirror of the repository is kept there
+      (see update_mirror) and the clone is made out of it, which saves
+      cloning the whole repository over the network every time
+    :type mirrors_folder: str
+    :param sparse_paths: if given, only the default branch is cloned (like a
+      complete clone would check out), without the contents of the files
+      (a partial clone), and only these paths are checked out; the clone can
+      still be committed on and pushed (shallow and depth are ignored)
+    :type sparse_paths: list
     :return: the cloned repository
     :rtype: git.Repo
     """
@@ -197,23 +562,56 @@ def git_repo(source, shallow=True, depth=100):
     if source.pushurl is not None:
         url = source.pushurl
 
-    if shallow:
+    sparse = sparse_paths is not None
+    shallow = shallow and not sparse
+    remote_url = source.url if shallow else url
+    clone_url = remote_url
+    clone_options = {}
+    if mirrors_folder is not None:
+        clone_url = update_mirror(remote_url, mirrors_folder)
+        if shallow:
+            # git ignores --depth on local clones, unless it is a file:// URL
+            clone_url = f'file://{clone_url}'
+        else:
+            # borrow the objects from the mirror rather than copying them
+            clone_options['shared'] = True
+    elif sparse:
+        # only the files that are checked out are downloaded
+        clone_options['filter'] = 'blob:none'
+
+    if sparse:
+        repo = Repo.clone_from(
+            clone_url,
+            tmp_dir,
+            single_branch=True,
+            no_checkout=True,
+            **clone_options,
+        )
+        repo.git.sparse_checkout('set', '--no-cone', *sparse_paths)
+        repo.git.checkout(repo.head.reference.name)
+    elif shallow:
         repo = Repo.clone_from(
-            source.url,
+            clone_url,
             tmp_dir,
             depth=depth,
             no_single_branch=True,
             branch=source.branch,
         )
     else:
-        repo = Repo.clone_from(url, tmp_dir)
+        repo = Repo.clone_from(clone_url, tmp_dir, **clone_options)
 
-    # give the control back
-    yield repo
+    if clone_url != remote_url:
+        # pushes go to the actual repository, not to the mirror
+        repo.remote().set_url(remote_url)
 
-    # cleanup
-    del repo
-    rmtree(tmp_dir)
+    try:
+        # give the control back
+        yield repo
+    finally:
+        # cleanup
+        repo.close()
+        del repo
+        rmtree(tmp_dir)
 
 
 @contextmanager
@@ -226,10 +624,10 @@ def wrap_folder(new_folder):
     """
     current_directory = os.getcwd()
     os.chdir(new_folder)
-
-    yield
-
-    os.chdir(current_directory)
+    try:
+        yield
+    finally:
+        os.chdir(current_directory)
 
 
 @contextmanager
@@ -237,39 +635,7 @@ def wrap_sys_argv():
     """Context manager to temporally save sys.argv and restore if afterwards"""
     original_args = sys.argv
     sys.argv = ['']
-
-    yield
-
-    sys.argv = original_args
-
-
-def get_servers(section):
-    """Get the server details for the given section
-
-    This is a generic way to get a connection string without having to define it
-    here in the source code.
-    """
-    servers = []
     try:
-        with open('release.cfg') as config_file:
-            servers_config = configparser.ConfigParser()
-            servers_config.readfp(config_file)
-            connection_strings = servers_config.get(section, 'servers')
-            for connection in connection_strings.strip().split('\n'):
-                servers.append(_server_details(connection))
-    except ValueError:
-        logger.info('Something went wrong trying to get the connection string')
-        raise
-
-    return servers
-
-
-def _server_details(line):
-    if '@' not in line:
-        raise ValueError(f'No user/server on {line}')
-    user, server = line.strip().split('@')
-
-    if ':' not in server:
-        raise ValueError(f'No server/path on {line}')
-    server, path = server.split(':')
-    return user, server, path
+        yield
+    finally:
+        sys.argv = original_args
@@ -0,0 +1,134 @@
+import logging
+import os
+import re
+import shutil
+import tempfile
+
+
+logger = logging.getLogger(__name__)
+
+#: a 'distribution = version' line, on its own, without leading whitespace
+PIN_LINE = re.compile(r'^(?P<name>[^\s=#;\[]+)\s*=')
+
+
+class VersionPins:
+    """Edit the version pins of a buildout versions file in a single pass
+
+    plone.releaser's Buildout.set_version re-reads and rewrites the whole
+    file for every single pin, here the file is read once, all pins are
+    updated in memory and the file is written back once, atomically.
+
+    Comments, the order of the pins and other sections are kept as they are,
+    distributions are matched case-insensitively and new ones are added at
+    the end of the section.
+
+    :param path: path to the versions file
+    :type path: str
+    :param section: section where the pins are
+    :type section: str
+    """
+
+    def __init__(self, path, section='versions'):
+        self.path = os.fspath(path)
+        self.section = section
+        with open(self.path) as versions_file:
+            self.lines = versions_file.read().splitlines()
+        self._changed = False
+
+    def update(self, pins):
+        """Set the given version pins
+
+        :param pins: new version, keyed by distribution name
+        :type pins: dict
+        :return: names of the distributions whose pin changed
+        :rtype: list
+        """
+        pending = {name.lower(): (name, version) for name, version in pins.items()}
+        changed = []
+        lines = []
+        found = set()
+        in_section = False
+        section_end = None
+        header = f'[{self.section}]'
+
+        for line in self.lines:
+            line = line.rstrip()
+            if line.startswith('['):
+                if in_section:
+                    section_end = len(lines)
+                in_section = line == header
+            elif in_section:
+                match = PIN_LINE.match(line)
+                key = match and match.group('name').lower()
+                if key in pending:
+                    if key in found:
+                        # a duplicate pin, only the first one is kept
+                        continue
+                    found.add(key)
+                    name, version = pending[key]
+                    new_line = f'{name} = {version}'
+                    if line != new_line:
+                        changed.append(name)
+                        line = new_line
+            lines.append(line)
+
+        if in_section:
+            section_end = len(lines)
+        if section_end is None:
+            # there is no such section, add it
+            if lines and lines[-1]:
+                lines.append('')
+            lines.append(header)
+            section_end = len(lines)
+
+        # add the missing ones at the end of the section, before its
+        # trailing empty lines
+        while section_end > 0 and not lines[section_end - 1]:
+            section_end -= 1
+        missing = [pending[key] for key in pending if key not in found]
+        lines[section_end:section_end] = [
+            f'{name} = {version}' for name, version in missing
+        ]
+        changed.extend(name for name, version in missing)
+
+        if changed or len(lines) != len(self.lines):
+            self._changed = True
+        self.lines = lines
+        for name in changed:
+            logger.debug(f'{self.path}: set {name} = {pins[name]}')
+        return changed
+
+    def save(self):
+        """Write the file back, if anything changed
+
+        The new contents are written on a temporary file that replaces the
+        original, so that the file is never left half written.
+        """
+        if not self._changed:
+            return
+        folder = os.path.dirname(os.path.abspath(self.path))
+        with tempfile.NamedTemporaryFile(
+            'w', dir=folder, prefix='.versions-', delete=False
+        ) as tmp_file:
+            tmp_file.write('\n'.join(self.lines) + '\n')
+        shutil.copymode(self.path, tmp_file.name)
+        os.replace(tmp_file.name, self.path)
+        self._changed = False
+
+
+def set_versions(path, pins):
+    """Set the given version pins on a versions file
+
+    See VersionPins.
+
+    :param path: path to the versions file
+    :type path: str
+    :param pins: new version, keyed by distribution name
+    :type pins: dict
+    :return: names of the distributions whose pin changed
+    :rtype: list
+    """
+    version_pins = VersionPins(path)
+    changed = version_pins.update(pins)
+    version_pins.save()
+    return changed
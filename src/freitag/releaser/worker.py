@@ -0,0 +1,211 @@
+"""Run zest.releaser commands for a single distribution on their own process
+
+zest.releaser works on the current working directory and reads its options
+from sys.argv, both global to the process: running each command on its own
+process allows to release multiple distributions at the same time without
+them interfering with each other.
+
+The worker process is started with::
+
+    python -m freitag.releaser.worker fullrelease --result result.json --no-input
+"""
+
+import argparse
+import codecs
+import json
+import logging
+import os
+import select
+import subprocess
+import sys
+import tempfile
+import threading
+
+
+logger = logging.getLogger(__name__)
+
+#: zest.releaser commands that can be run on a worker
+COMMANDS = ('fullrelease', 'bumpversion')
+
+#: seconds to wait for the end of a line before showing it anyway,
+#: i.e. a question waiting for an answer
+PARTIAL_LINE_TIMEOUT = 0.2
+
+#: workers running at the same time share the output, write one at a time
+_output_lock = threading.Lock()
+
+
+def _environment():
+    """Environment for the worker process
+
+    Buildout scripts put their eggs on sys.path from within the script, the
+    worker gets them through PYTHONPATH so that it can import
+    freitag.releaser, zest.releaser and its hooks as well.
+    """
+    paths = os.environ.get('PYTHONPATH', '').split(os.pathsep) + sys.path
+    paths = [os.path.abspath(path) for path in paths if path]
+    return {**os.environ, 'PYTHONPATH': os.pathsep.join(dict.fromkeys(paths))}
+
+
+class ReleaseWorker:
+    """Run a zest.releaser command on a separate process
+
+    The process runs within the distribution folder, and its output is
+    streamed back prefixed with the distribution name.
+    """
+
+    #: system path where the distribution is
+    path = None
+
+    #: prefix for each line of output
+    prefix = None
+
+    def __init__(self, path, name=None, output=None):
+        self.path = path
+        name = name or os.path.basename(os.path.normpath(path))
+        self.prefix = f'[{name}] '
+        self._output = output
+
+    def run(self, command, *args):
+        """Run the given zest.releaser command
+
+        The standard input is shared with the worker, so that questions can
+        still be answered.
+
+        :param command: one of COMMANDS
+        :type command: str
+        :param args: extra arguments for the command
+        :type args: str
+        :return: what the command reports back, i.e. the version
+        :rtype: dict
+        :raises: subprocess.CalledProcessError if the command fails
+        """
+        if command not in COMMANDS:
+            raise ValueError(f'{command} is not one of {COMMANDS}')
+
+        handle, result_path = tempfile.mkstemp(prefix='release-', suffix='.json')
+        os.close(handle)
+        cmd = [
+            sys.executable,
+            '-m',
+            'freitag.releaser.worker',
+            command,
+            '--result',
+            result_path,
+            *args,
+        ]
+        try:
+            process = subprocess.Popen(
+                cmd,
+                cwd=self.path,
+                env=_environment(),
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+            )
+            self._stream(process.stdout)
+            return_code = process.wait()
+            if return_code != 0:
+                raise subprocess.CalledProcessError(return_code, cmd)
+
+            with open(result_path) as result_file:
+                return json.load(result_file)
+        finally:
+            os.remove(result_path)
+
+    def _stream(self, pipe):
+        """Copy the output of the worker, prefixing each line
+
+        Only whole lines are written, so that the output of workers running
+        at the same time does not get mixed. A line that does not end is
+        only written if nothing else comes for a while, so that questions
+        (which do not end with a new line) are still shown.
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+        self._line_start = True
+        fileno = pipe.fileno()
+        pending = ''
+        while True:
+            if pending:
+                ready, _, _ = select.select([fileno], [], [], PARTIAL_LINE_TIMEOUT)
+                if not ready:
+                    self._write(pending)
+                    pending = ''
+            chunk = os.read(fileno, 4096)
+            if not chunk:
+                break
+            text = pending + decoder.decode(chunk)
+            lines, new_line, pending = text.rpartition('\n')
+            if new_line:
+                self._write(lines + new_line)
+        pending += decoder.decode(b'', final=True)
+        if pending:
+            self._write(pending)
+        pipe.close()
+
+    def _write(self, text):
+        prefixed = []
+        for index, line in enumerate(text.split('\n')):
+            if index > 0:
+                prefixed.append('\n')
+                self._line_start = True
+            if not line:
+                continue
+            if self._line_start:
+                prefixed.append(self.prefix)
+                self._line_start = False
+            prefixed.append(line)
+
+        output = self._output or sys.stdout
+        with _output_lock:
+            output.write(''.join(prefixed))
+            output.flush()
+
+
+def _released_version():
+    """The version of the last tag, as zest.releaser has just created it"""
+    output = subprocess.run(
+        ['git', 'describe', '--tags'],
+        capture_output=True,
+        check=True,
+        text=True,
+    ).stdout
+    return output.strip().split('-')[0]
+
+
+def _run_zest_releaser(command):
+    """zest.releaser exits early, but successfully, when there is nothing to
+    do (e.g. no version bump is needed), report back in that case as well
+    """
+    try:
+        command()
+    except SystemExit as error:
+        if error.code not in (None, 0):
+            raise
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('command', choices=COMMANDS)
+    parser.add_argument('--result', required=True)
+    options, args = parser.parse_known_args(argv)
+
+    # zest.releaser reads its options from sys.argv
+    sys.argv = [f'bin/{options.command}', *args]
+    if options.command == 'fullrelease':
+        from zest.releaser import fullrelease
+
+        _run_zest_releaser(fullrelease.main)
+        version = _released_version()
+    else:
+        from zest.releaser import bumpversion
+        from zest.releaser.choose import version_control
+
+        _run_zest_releaser(bumpversion.main)
+        version = version_control().version
+
+    with open(options.result, 'w') as result_file:
+        json.dump({'version': version}, result_file)
+
+
+if __name__ == '__main__':
+    main()